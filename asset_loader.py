@@ -0,0 +1,72 @@
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from asset_registry import registry
+
+class AssetLoader():
+
+    # decodes assets on worker threads, the main thread only runs gl uploads within a per frame budget in seconds
+    def __init__(self, asset_registry = None, workers = 4, budget = 0.002):
+
+        self.registry = asset_registry if asset_registry else registry
+        self.executor = ThreadPoolExecutor(workers)
+        self.budget = budget
+
+        # (kind, key) -> callbacks waiting on the asset
+        self.pending = {}
+
+        # decoded assets handed from the workers to the main thread
+        self.uploads = queue.Queue()
+
+        # progress and timing
+        self.requested = 0
+        self.completed = 0
+        self.upload_time = 0
+
+    # calls on_ready(value) on the main thread once the asset is uploaded, holding one registry reference
+    def request(self, kind, key, on_ready):
+
+        if self.registry.is_loaded(kind, key):
+            on_ready(self.registry.acquire(kind, key))
+            return
+        if (kind, key) in self.pending:
+            self.pending[(kind, key)].append(on_ready)
+            return
+
+        self.pending[(kind, key)] = [on_ready]
+        self.requested += 1
+        future = self.executor.submit(self.registry.decode, kind, key)
+        future.add_done_callback(lambda future: self.uploads.put((kind, key, future)))
+
+    # runs queued uploads until the budget is spent, always at least one so loading never stalls
+    def update(self):
+
+        start = time.perf_counter()
+        while not self.uploads.empty():
+            kind, key, future = self.uploads.get()
+
+            # decode errors are raised here, on the main thread
+            callbacks = self.pending.pop((kind, key))
+            self.registry.add(kind, key, self.registry.upload(kind, future.result()))
+            for on_ready in callbacks: on_ready(self.registry.acquire(kind, key))
+            self.completed += 1
+
+            if time.perf_counter() - start >= self.budget: break
+        self.upload_time += time.perf_counter() - start
+
+    def is_done(self):
+
+        return self.completed == self.requested
+
+    # fraction of requested assets that are ready
+    def get_progress(self):
+
+        return self.completed / self.requested if self.requested else 1
+
+    def get_stats(self):
+
+        return {'requested' : self.requested, 'completed' : self.completed, 'upload_ms' : self.upload_time * 1e3}
+
+    def destroy(self):
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,94 @@
+import threading
+from mesh_cache import load_mesh
+
+class Asset():
+
+    def __init__(self, value, release = None):
+
+        self.value = value
+        self.release = release
+        self.references = 0
+
+class AssetRegistry():
+
+    # loads every asset once per key and shares it until the last reference is released
+    def __init__(self):
+
+        # kind -> (load(key), release(value) or None, upload(data) or None)
+        self.loaders = {}
+        self.assets = {}
+
+        # background loaders acquire from worker threads, loads themselves run outside the lock
+        self.lock = threading.RLock()
+
+        # counters for benchmarking
+        self.loads = 0
+        self.releases = 0
+
+    # kinds with an upload step split loading into load(key), safe on any thread, and upload(data) on the gl thread
+    def register_loader(self, kind, load, release = None, upload = None):
+
+        self.loaders[kind] = (load, release, upload)
+
+    def decode(self, kind, key):
+
+        return self.loaders[kind][0](key)
+
+    def upload(self, kind, data):
+
+        upload = self.loaders[kind][2]
+        return upload(data) if upload else data
+
+    def is_loaded(self, kind, key):
+
+        return (kind, key) in self.assets
+
+    def acquire(self, kind, key):
+
+        with self.lock:
+            asset = self.assets.get((kind, key))
+            if asset:
+                asset.references += 1
+                return asset.value
+
+        return self.add(kind, key, self.upload(kind, self.decode(kind, key)), 1)
+
+    # stores a loaded value, if another thread finished the same key first its value is kept and this one released
+    def add(self, kind, key, value, references = 0):
+
+        release = self.loaders[kind][1]
+        with self.lock:
+            asset = self.assets.setdefault((kind, key), Asset(value, release))
+            asset.references += references
+            if asset.value is value:
+                self.loads += 1
+                return value
+
+        if release: release(value)
+        return asset.value
+
+    # drops one reference, gl resources are freed with the last one
+    def release(self, kind, key):
+
+        with self.lock:
+            asset = self.assets[(kind, key)]
+            asset.references -= 1
+            if asset.references > 0: return
+
+            del self.assets[(kind, key)]
+            self.releases += 1
+        if asset.release: asset.release(asset.value)
+
+    def get_references(self, kind, key):
+
+        asset = self.assets.get((kind, key))
+        return asset.references if asset else 0
+
+    def get_stats(self):
+
+        return {'assets' : len(self.assets), 'loads' : self.loads, 'releases' : self.releases,
+                'references' : sum(asset.references for asset in list(self.assets.values()))}
+
+# shared by every handler, gl loaders are registered by the handlers that own the context
+registry = AssetRegistry()
+registry.register_loader('mesh', load_mesh)
@@ -0,0 +1,463 @@
+import gzip
+import os
+import sys
+import json
+import time
+import hashlib
+import tracemalloc
+import glm
+import numpy as np
+from gjk import GJK
+from hitboxes import Hitbox, HitboxGeometry, FittedHitbox
+from asset_registry import registry
+from convex_hull import ConvexHull
+from rigid_body_world import RigidBodyWorld
+from physics_world import PhysicsWorld, build_box_rain
+from profiler import profiler
+from culling import BVH, Frustum, OUTSIDE
+from vbo_handler import BaseVBO
+from mesh_cache import weld, load_mesh, get_cache_path, build_mesh, read_mesh, build_lods
+from light_handler import LightHandler, PointLight
+
+CAT_CACHE = 'objects/cat/20430_Cat_v1_NEW.obj.bin'
+CAT_SOURCE = 'objects/cat/20430_Cat_v1_NEW.obj'
+
+
+# minimal stand-in for Object so hitboxes can be built without a gl context
+class BenchmarkModel:
+    def __init__(self, m_model):
+        self.m_model = m_model
+
+    def get_model_array(self):
+        return np.frombuffer(self.m_model.to_bytes(), dtype='f4').reshape(4, 4)
+
+
+class BenchmarkBody:
+    def __init__(self, pos=(0, 0, 0), scale=(1, 1, 1), immovable=False):
+        self.pos = glm.vec3(pos)
+        self.scale = glm.vec3(scale)
+        self.immovable = immovable
+        self.model = BenchmarkModel(glm.scale(glm.translate(glm.mat4(), self.pos), self.scale))
+        self.hitbox = None
+
+
+def load_cat_data():
+    # pywavefront cache stores interleaved T2F_N3F_V3F floats
+    return np.frombuffer(gzip.open(CAT_CACHE).read(), dtype='f4').reshape(-1, 8)
+
+
+def load_cat_vertices():
+    return np.unique(load_cat_data()[:, 5:], axis=0)
+
+
+def get_furthest_point_loop(hitbox, vec):
+    # per vertex support search as it was before vectorization
+    best = (glm.vec3(0, 0, 0), -1e6)
+    for point in [hitbox.obj.model.m_model * glm.vec3(*vertex) for vertex in hitbox.vertices.tolist()]:
+        dot = glm.dot(point, vec)
+        if dot > best[1]: best = (point, dot)
+    return best[0]
+
+
+def time_calls(func, repeats):
+    start = time.perf_counter()
+    for i in range(repeats):
+        func(i)
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark_support(repeats=20):
+    vertices = load_cat_vertices()
+    body = BenchmarkBody(pos=(1, 2, 3), scale=(0.5, 0.5, 0.5))
+    body.hitbox = Hitbox(body, HitboxGeometry(vertices, [], (1, 1, 1)))
+    gjk = GJK()
+    directions = [glm.normalize(glm.vec3(np.sin(i), np.cos(i * 0.7), np.sin(i * 1.3))) for i in range(repeats)]
+
+    loop = time_calls(lambda i: get_furthest_point_loop(body.hitbox, directions[i]), max(1, repeats // 10))
+    # first call fills the world vertex cache, only steady state queries are timed
+    gjk.get_furthest_point(body.hitbox, directions[0])
+    vectorized = time_calls(lambda i: gjk.get_furthest_point(body.hitbox, directions[i]), repeats)
+    return {'vertices': len(vertices), 'loop_ms': loop * 1e3, 'vectorized_ms': vectorized * 1e3, 'speedup': loop / vectorized}
+
+
+def benchmark_hull_support(repeats=2000, max_hull_vertices=None):
+    vertices = load_cat_vertices()
+    start = time.perf_counter()
+    hull = ConvexHull(vertices, max_hull_vertices)
+    hull_time = time.perf_counter() - start
+
+    body = BenchmarkBody(pos=(1, 2, 3), scale=(0.5, 0.5, 0.5))
+    raw = Hitbox(body, HitboxGeometry(vertices, [], (1, 1, 1)))
+    climbing = Hitbox(body, HitboxGeometry(hull.vertices, hull.faces, (1, 1, 1), hull.adjacency))
+    # slowly turning directions, like consecutive gjk iterations and frames
+    directions = [glm.normalize(glm.vec3(np.cos(i * 0.05), np.sin(i * 0.03), np.sin(i * 0.05))) for i in range(repeats)]
+
+    gjk = GJK()
+    gjk.get_furthest_point(raw, directions[0])
+    return {'vertices': len(vertices), 'hull_vertices': len(hull.vertices), 'hull_build_ms': hull_time * 1e3,
+            'scan_raw_us': time_calls(lambda i: gjk.get_furthest_point(raw, directions[i]), repeats) * 1e6,
+            'hill_climb_us': time_calls(lambda i: gjk.get_furthest_point(climbing, directions[i]), repeats) * 1e6}
+
+
+def benchmark_gjk_batch(count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    cube = [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1), (1, -1, -1), (1, 1, -1)]
+    geometry = HitboxGeometry(cube, [], (2, 2, 2))
+    bodies = []
+    for pos in rng.uniform(-4, 4, (count, 3)).tolist():
+        body = BenchmarkBody(pos=pos, scale=(0.5, 0.5, 0.5))
+        body.hitbox = Hitbox(body, geometry)
+        bodies.append(body)
+    pairs = [(bodies[i].hitbox, bodies[j].hitbox) for i in range(count) for j in range(i + 1, count)]
+
+    gjk = GJK()
+    start = time.perf_counter()
+    single = [gjk.get_gjk_collision(*pair)[0] for pair in pairs]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = [result[0] for result in gjk.get_gjk_collision_batch(pairs)]
+    batch_time = time.perf_counter() - start
+    return {'pairs': len(pairs), 'collisions': sum(single), 'mismatches': sum(a != b for a, b in zip(single, batch)),
+            'single_ms': single_time * 1e3, 'batch_ms': batch_time * 1e3}
+
+
+def benchmark_weld():
+    data = load_cat_data()
+    start = time.perf_counter()
+    vertices, indices = weld(data)
+    weld_time = time.perf_counter() - start
+    return {'unrolled_vertices': len(data), 'welded_vertices': len(vertices), 'index_type': str(indices.dtype),
+            'unrolled_mb': data.nbytes / 2 ** 20, 'indexed_mb': (vertices.nbytes + indices.nbytes) / 2 ** 20,
+            'reduction': data.nbytes / (vertices.nbytes + indices.nbytes), 'weld_ms': weld_time * 1e3}
+
+
+def benchmark_mesh_cache(source=CAT_SOURCE, repeats=20):
+    def load(i):
+        mesh = load_mesh(source)
+        vertices, indices = mesh.get_render_data()
+        return vertices, indices, mesh.get_hull(), mesh.get_bounds()
+
+    # the cold build compiles into a scratch file, so the real cache is never deleted, a missing obj builds from pywavefront's cache
+    scratch_path = get_cache_path(source) + '.benchmark'
+
+    def build(i):
+        build_mesh(source, scratch_path)
+        return read_mesh(scratch_path)
+    cold = time_calls(build, 1)
+    cache_mb = os.path.getsize(scratch_path) / 2 ** 20
+    os.remove(scratch_path)
+
+    # the first load compiles the real cache if it is missing
+    load(0)
+    warm = time_calls(load, repeats)
+    return {'cache_mb': cache_mb, 'cold_ms': cold * 1e3, 'warm_ms': warm * 1e3, 'speedup': cold / warm}
+
+
+def benchmark_shared_hitboxes(file_name='cat/20430_Cat_v1_NEW', count=500):
+    # every hitbox after the first reuses the geometry, so spawning costs the same for any mesh size
+    loads = registry.loads
+    start = time.perf_counter()
+    hitboxes = [FittedHitbox(BenchmarkBody(), file_name) for i in range(count)]
+    spawn_time = time.perf_counter() - start
+    key, geometry = hitboxes[0].key, hitboxes[0].geometry
+    stats = {'hitboxes': count, 'loads': registry.loads - loads, 'shared': all(h.geometry is geometry for h in hitboxes),
+             'shared_vertices_kb': geometry.vertices.nbytes / 1024, 'spawn_ms': spawn_time * 1e3}
+    for hitbox in hitboxes:
+        hitbox.release()
+    stats['references_after_release'] = registry.get_references('hitbox', key)
+    return stats
+
+
+def benchmark_program_cache(repeats=1000, **context_args):
+    # startup compiles every variant once, the driver's shader cache decides how much of that is a real compile
+    import moderngl as mgl
+    from shader_program_handler import ProgramHandler, VARIANTS
+
+    ctx = mgl.create_standalone_context(**context_args)
+    start = time.perf_counter()
+    program_handler = ProgramHandler(ctx)
+    for name in VARIANTS:
+        program_handler.programs[name]
+    startup_time = time.perf_counter() - start
+    lookup = time_calls(lambda i: program_handler.get_program('default', ('INSTANCED', 'CLUSTERED_LIGHTING')), repeats)
+    stats = program_handler.get_stats()
+    program_handler.destroy()
+    ctx.release()
+    return {'variants': len(VARIANTS), 'programs': stats['programs'], 'startup_ms': startup_time * 1e3,
+            'compile_ms': stats['compile_ms'], 'cache_hits': stats['cache_hits'], 'cached_lookup_us': lookup * 1e6}
+
+
+def benchmark_lod(source=CAT_SOURCE, count=500, win_height=720, seed=0):
+    mesh = load_mesh(source)
+    vertices, indices = mesh.get_render_data()
+    start = time.perf_counter()
+    offsets, lod_indices, errors = build_lods(vertices[:, 5:], indices)
+    build_time = time.perf_counter() - start
+
+    # a crowd of cats spread over the view distance, each drawn at the coarsest level that stays under the pixel error
+    rng = np.random.default_rng(seed)
+    pixels_per_unit = 0.3 * glm.perspective(glm.radians(50), 16 / 9, 0.1, 250)[1][1] * win_height / 2 / rng.uniform(5, 250, count)
+    vbo = BaseVBO.__new__(BaseVBO)
+    vbo.lod_errors = np.concatenate([[0], errors])
+    levels = vbo.get_lod(pixels_per_unit)
+    triangles = np.concatenate([[len(indices)], np.diff(offsets)]) // 3
+    return {'level_triangles': triangles.tolist(), 'level_errors': vbo.lod_errors.tolist(), 'build_ms': build_time * 1e3,
+            'objects': count, 'full_triangles': int(count * triangles[0]), 'lod_triangles': int(triangles[levels].sum()),
+            'objects_per_level': np.bincount(levels, minlength=len(triangles)).tolist()}
+
+
+def benchmark_integration(count=10000, steps=200, seed=0):
+    rng = np.random.default_rng(seed)
+    world = RigidBodyWorld(count)
+    for pos in rng.uniform(-50, 50, (count, 3)).tolist():
+        world.add_body(None, pos)
+
+    start = time.perf_counter()
+    for i in range(steps):
+        world.store_previous()
+        world.integrate(1 / 60, (0, -9.8, 0))
+    return {'bodies': count, 'step_ms': (time.perf_counter() - start) / steps * 1e3}
+
+
+def benchmark_culling(count=20000, frames=50, seed=0, brute_force_count=0, moving=1.0):
+    # a large level seen from its center, most objects are behind or beside the camera
+    rng = np.random.default_rng(seed)
+    world = RigidBodyWorld(count)
+    for pos, rot in zip(rng.uniform(-500, 500, (count, 3)).tolist(), rng.uniform(-3, 3, (count, 3)).tolist()):
+        world.add_body(None, pos, rot)
+    world.bound_min[:count], world.bound_max[:count] = -1, 1
+    m_proj = glm.perspective(glm.radians(50), 16 / 9, 0.1, 250)
+
+    bvh = BVH(brute_force_count=brute_force_count)
+    update_time = cull_time = brute_time = visible = mismatches = 0
+    for i in range(frames):
+        # only the first moving share of the bodies moves, like a level of mostly static props
+        world.pos[:int(moving * count), 0] += 0.1
+        world.dirty[:int(moving * count)] = True
+        world.update_render_matrices(1)
+        frustum = Frustum(m_proj * glm.lookAt(glm.vec3(0), glm.vec3(np.cos(i * 0.1), 0, np.sin(i * 0.1)), glm.vec3(0, 1, 0)))
+
+        start = time.perf_counter()
+        bvh.update(world.render_matrix[:count], world.bound_min[:count], world.bound_max[:count])
+        update_time += time.perf_counter() - start
+        start = time.perf_counter()
+        mask = bvh.cull(frustum)
+        cull_time += time.perf_counter() - start
+        # brute force needs the world bounds as well, so they count towards its time too
+        start = time.perf_counter()
+        brute = frustum.classify(*bvh.get_world_bounds(world.render_matrix[:count], world.bound_min[:count], world.bound_max[:count])) != OUTSIDE
+        brute_time += time.perf_counter() - start
+        visible += int(mask.sum())
+        mismatches += int((mask != brute).sum())
+    return {'objects': count, 'moving': moving, 'visible': visible / frames, 'mismatches': mismatches, 'refit_ms': update_time / frames * 1e3, 'cull_ms': cull_time / frames * 1e3,
+            'brute_force_ms': brute_time / frames * 1e3, 'builds': bvh.builds}
+
+
+class BenchmarkCamera:
+    def __init__(self, aspect_ratio, position=(0, 15, 30)):
+        self.position = glm.vec3(position)
+        self.m_proj = glm.perspective(glm.radians(50), aspect_ratio, 0.1, 250)
+        self.m_view = glm.lookAt(self.position, glm.vec3(0), glm.vec3(0, 1, 0))
+
+
+def benchmark_clustered_lighting(count=256, win_size=(640, 360), frames=3, seed=0, **context_args):
+    # a lit floor under many small point lights, one cluster with a negligible cutoff shades every pixel with every light
+    import moderngl as mgl
+    from vbo_handler import CubeVBO
+    from shader_program_handler import ProgramHandler
+    from uniform_buffer_handler import UniformBufferHandler
+    from clustered_lighting import ClusteredLighting
+
+    ctx = mgl.create_standalone_context(**context_args)
+    rng = np.random.default_rng(seed)
+    light_handler = LightHandler()
+    light_handler.point_lights = [PointLight(pos=(x, 0.5, z), color=tuple(rng.uniform(0.2, 1, 3)), linear=0.7, quadratic=1.8)
+                                  for x, z in rng.uniform(-40, 40, (count, 2)).tolist()]
+    camera = BenchmarkCamera(win_size[0] / win_size[1])
+    UniformBufferHandler(ctx).update(camera, light_handler)
+
+    program = ProgramHandler(ctx).programs['default']
+    vbo = CubeVBO(ctx)
+    vao = ctx.vertex_array(program, [(vbo.vbo, vbo.format, *vbo.attribs)], index_buffer=vbo.ibo, index_element_size=vbo.index_element_size)
+    texture = ctx.texture((1, 1), 3, bytes((200, 200, 200)))
+    texture.use(location=1)
+    program['material.d'], program['material.s'], program['material.spec_const'] = 1, 1, 64.0
+    program['m_model'].write(glm.scale(glm.translate(glm.mat4(), glm.vec3(0, -1, 0)), glm.vec3(50, 1, 50)))
+    fbo = ctx.simple_framebuffer(win_size)
+    ctx.enable(mgl.DEPTH_TEST)
+
+    def render(lighting):
+        lighting.bind_programs({'default': program})
+        start = time.perf_counter()
+        lighting.update(camera, light_handler)
+        update_time = time.perf_counter() - start
+        fbo.use()
+        fbo.clear()
+        ctx.finish()
+        start = time.perf_counter()
+        for i in range(frames):
+            vao.render()
+        ctx.finish()
+        image = np.frombuffer(fbo.read(), dtype='u1').astype(int)
+        return image, update_time, (time.perf_counter() - start) / frames
+
+    reference, _, reference_time = render(ClusteredLighting(ctx, win_size, 0.1, 250, tiles=(1, 1), slices=1, threshold=1e-9))
+    clustered_lighting = ClusteredLighting(ctx, win_size, 0.1, 250)
+    image, update_time, clustered_time = render(clustered_lighting)
+    stats = clustered_lighting.get_stats()
+    ctx.release()
+    return {'lights': count, 'clusters': stats['clusters'], 'assignments': stats['assignments'], 'assign_ms': update_time * 1e3,
+            'all_lights_ms': reference_time * 1e3, 'clustered_ms': clustered_time * 1e3, 'speedup': reference_time / clustered_time,
+            'max_pixel_difference': int(np.abs(reference - image).max())}
+
+
+def build_pile(physics, count=1000, columns=10):
+    # a jittered grid of boxes collapsing onto a floor
+    rng = physics.rng
+    physics.add_body(pos=(0, -1, 0), scale=(30, 0.5, 30), immovable=True, gravity=False)
+    for i in range(count):
+        layer, cell = divmod(i, columns * columns)
+        x, z = divmod(cell, columns)
+        physics.add_body(pos=(1.5 * (x - columns / 2) + rng.uniform(-0.2, 0.2), 1 + 1.2 * layer, 1.5 * (z - columns / 2) + rng.uniform(-0.2, 0.2)),
+                         rot=(rng.uniform(-10, 10), rng.uniform(-10, 10), rng.uniform(-10, 10)), scale=(0.5, 0.5, 0.5))
+
+
+def build_fitted_mesh(physics, count=12, file_name='cat/20430_Cat_v1_NEW'):
+    # convex hull hitboxes of the cat mesh tumbling onto a slab and each other
+    rng = physics.rng
+    physics.add_body(pos=(0, -1, 0), scale=(10, 0.5, 10), immovable=True, gravity=False)
+    for i in range(count):
+        physics.add_body(pos=(rng.uniform(-3, 3), 2 + 2 * i, rng.uniform(-3, 3)), rot=(rng.uniform(-180, 180), rng.uniform(-180, 180), 0),
+                         scale=(0.1, 0.1, 0.1), hitbox_type='fitted', hitbox_file_name=file_name)
+
+
+# name -> (builder, default steps)
+PHYSICS_SCENARIOS = {'box_rain': (build_box_rain, 600), 'pile': (build_pile, 60), 'fitted_mesh': (build_fitted_mesh, 300)}
+PHYSICS_COUNTERS = ('pair_tests', 'candidate_pairs', 'narrow_phase_tests', 'collisions', 'gjk_iterations', 'epa_iterations', 'impacts')
+
+
+def benchmark_physics(scenario='box_rain', steps=None, seed=0, delta_time=1 / 60):
+    build, default_steps = PHYSICS_SCENARIOS[scenario]
+    steps = steps or default_steps
+
+    # memory is traced over building and the first step only, tracing would slow the timed steps
+    tracemalloc.start()
+    physics = PhysicsWorld(seed=seed)
+    build(physics)
+    physics.step(delta_time)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    totals = dict.fromkeys(PHYSICS_COUNTERS, 0)
+    start = time.perf_counter()
+    for i in range(steps):
+        physics.step(delta_time)
+        stats = physics.pe.get_stats()
+        for key in PHYSICS_COUNTERS:
+            totals[key] += stats[key]
+    elapsed = time.perf_counter() - start
+
+    # identical seeds and code give the same hash, a changed hash means the simulation itself changed
+    world = physics.world
+    state = np.concatenate([world.pos[:world.count], world.rot[:world.count], world.vel[:world.count]])
+    return {'scenario': scenario, 'seed': seed, 'bodies': world.count, 'steps': steps, 'steps_per_second': steps / elapsed,
+            'step_ms': elapsed / steps * 1e3, **totals, 'sleeping': stats['sleeping'], 'peak_memory_mb': peak_memory / 2 ** 20,
+            'state_hash': hashlib.blake2b(state.tobytes(), digest_size=8).hexdigest()}
+
+
+def benchmark_profiler(steps=300, seed=0, calls=200000):
+    def run(enabled):
+        profiler.enable(enabled)
+        physics = PhysicsWorld(seed=seed)
+        build_box_rain(physics)
+        start = time.perf_counter()
+        for i in range(steps):
+            profiler.begin_frame()
+            physics.step(1 / 60)
+            profiler.end_frame()
+        return (time.perf_counter() - start) / steps
+
+    disabled, enabled = run(False), run(True)
+    stats = profiler.get_stats()
+    events = len(profiler.get_chrome_trace()['traceEvents'])
+    profiler.enable(False)
+
+    # cost a disabled profiler adds to every instrumented call
+    def plain():
+        pass
+    wrapped = profiler.profile('noop')(plain)
+    wrapper_cost = time_calls(lambda i: wrapped(), calls) - time_calls(lambda i: plain(), calls)
+    return {'steps': steps, 'disabled_step_ms': disabled * 1e3, 'enabled_step_ms': enabled * 1e3, 'enabled_overhead': enabled / disabled - 1,
+            'disabled_call_ns': wrapper_cost * 1e9, 'p50_ms': stats['p50_ms'], 'p99_ms': stats['p99_ms'],
+            'gjk_calls_per_step': stats['scopes']['gjk']['calls'], 'counters': stats['counters'], 'trace_events': events}
+
+
+def benchmark_continuous_collision(count=50, seconds=3, seed=0, delta_times=(1 / 60, 1 / 30, 1 / 15, 1 / 8)):
+    # boxes thrown down at a thin slab, the ones ending below it passed through
+    def run(delta_time, continuous):
+        physics = PhysicsWorld(seed=seed)
+        if not continuous:
+            physics.pe.continuous_collision = None
+        rng = physics.rng
+        physics.add_body(pos=(0, 0, 0), scale=(20, 0.5, 20), immovable=True, gravity=False)
+        for i in range(count):
+            physics.add_body(pos=(rng.uniform(-15, 15), rng.uniform(40, 60), rng.uniform(-15, 15)), scale=(0.5, 0.5, 0.5), vel=(0, -20, 0))
+
+        steps, impacts = int(seconds / delta_time), 0
+        start = time.perf_counter()
+        for i in range(steps):
+            physics.step(delta_time)
+            impacts += physics.pe.get_stats().get('impacts', 0)
+        elapsed = time.perf_counter() - start
+        world = physics.world
+        return {'tunneled': int((world.pos[1:world.count, 1] < -0.5).sum()), 'impacts': impacts, 'step_ms': elapsed / steps * 1e3,
+                'simulated_second_ms': elapsed / seconds * 1e3}
+
+    return [{'delta_time': delta_time, 'discrete': run(delta_time, False), 'continuous': run(delta_time, True)} for delta_time in delta_times]
+
+
+def benchmark_physics_suite(seed=0, scenarios=None):
+    return {name: benchmark_physics(name, seed=seed) for name in scenarios or PHYSICS_SCENARIOS}
+
+
+def benchmark_parallel_narrow_phase(scenario='pile', steps=30, seed=0, max_workers=None, delta_time=1 / 60):
+    build = PHYSICS_SCENARIOS[scenario][0]
+
+    def run(workers):
+        physics = PhysicsWorld(seed=seed, workers=workers)
+        build(physics)
+        # the first step starts the pool and loads hitbox geometry in every worker
+        physics.step(delta_time)
+        start = time.perf_counter()
+        for i in range(steps):
+            physics.step(delta_time)
+        elapsed = time.perf_counter() - start
+        world = physics.world
+        state = np.concatenate([world.pos[:world.count], world.rot[:world.count], world.vel[:world.count]])
+        stats = physics.pe.get_stats()
+        physics.close()
+        return elapsed / steps, hashlib.blake2b(state.tobytes(), digest_size=8).hexdigest(), stats
+
+    serial, _, _ = run(0)
+    curve, hashes = [], set()
+    for workers in range(1, (max_workers or os.cpu_count()) + 1):
+        step_time, state_hash, stats = run(workers)
+        hashes.add(state_hash)
+        curve.append({'workers': workers, 'step_ms': step_time * 1e3, 'speedup': curve[0]['step_ms'] / (step_time * 1e3) if curve else 1,
+                      'speedup_over_serial': serial / step_time, 'contact_islands': stats['contact_islands']})
+    # islands are merged in a fixed order, so every worker count must end in the same state
+    return {'scenario': scenario, 'steps': steps, 'cpus': os.cpu_count(), 'serial_step_ms': serial * 1e3, 'curve': curve,
+            'deterministic': len(hashes) == 1, 'state_hash': hashes.pop()}
+
+
+if __name__ == '__main__':
+    # python benchmark.py physics [seed] only runs the seeded physics scenarios, for regression tracking
+    if sys.argv[1:2] == ['physics']:
+        print(json.dumps(benchmark_physics_suite(int(sys.argv[2]) if len(sys.argv) > 2 else 0), indent=2))
+        sys.exit()
+    # python benchmark.py parallel [max workers] prints the scaling curve of the parallel narrow phase
+    if sys.argv[1:2] == ['parallel']:
+        print(json.dumps(benchmark_parallel_narrow_phase(max_workers=int(sys.argv[2]) if len(sys.argv) > 2 else None), indent=2))
+        sys.exit()
+    print(json.dumps({'support': benchmark_support(), 'hull_support': benchmark_hull_support(),
+                      'gjk_batch': benchmark_gjk_batch(), 'weld': benchmark_weld(), 'culling': benchmark_culling(), 'integration': benchmark_integration()}, indent=2))
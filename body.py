@@ -0,0 +1,140 @@
+import glm
+from hitboxes import CubeHitbox, FittedHitbox
+from rigid_body_world import IMMOVABLE, GRAVITY, SLEEPING
+
+# glm view onto one column of the body's row in the rigid body world
+def body_vec3(name, transform = False):
+
+    def get(self): return glm.vec3(getattr(self.world, name)[self.index])
+    def set(self, value):
+        getattr(self.world, name)[self.index] = value
+        # model matrix is rebuilt in the next batched update
+        if transform: self.world.dirty[self.index] = True
+    return property(get, set)
+
+def body_scalar(name):
+
+    def get(self): return float(getattr(self.world, name)[self.index])
+    def set(self, value): getattr(self.world, name)[self.index] = value
+    return property(get, set)
+
+def body_flag(flag):
+
+    def get(self): return self.world.get_flag(self.index, flag)
+    def set(self, value): self.world.set_flag(self.index, flag, value)
+    return property(get, set)
+
+class BodyModel():
+
+    # model matrix of a body, computed in batches by the rigid body world, rendered models extend this
+    def __init__(self, object):
+
+        self.object = object
+
+    @property
+    def m_model(self):
+
+        return glm.mat4.from_bytes(self.get_model_array().tobytes())
+
+    # column major (4, 4) float32 view of the model matrix
+    def get_model_array(self):
+
+        return self.object.world.get_model_matrix(self.object.index)
+
+    def update(self):
+
+        # hitbox world vertices depend on the model matrix
+        if self.object.hitbox: self.object.hitbox.set_dirty()
+
+class Body():
+
+    # physics state lives in packed arrays owned by the rigid body world
+    pos = body_vec3('pos', transform=True)
+    rot = body_vec3('rot', transform=True)
+    scale = body_vec3('scale', transform=True)
+    prev_pos = body_vec3('prev_pos')
+    prev_rot = body_vec3('prev_rot')
+    vel = body_vec3('vel')
+    rot_vel = body_vec3('rot_vel')
+    mass = body_scalar('mass')
+    immovable = body_flag(IMMOVABLE)
+    gravity = body_flag(GRAVITY)
+    sleeping = body_flag(SLEEPING)
+
+    def __init__(self, world, pos = (0, 0, 0), rot = (0, 0, 0), scale = (1, 1, 1), hitbox_type = 'cube', hitbox_file_name = None, rot_vel = (0, 0, 0), vel = (0, 0, 0), mass = 1, immovable = False, gravity = True):
+
+        # rot is in degrees
+        self.world = world
+        self.index = self.world.add_body(self, pos, [glm.radians(a) for a in rot], vel, rot_vel, mass if not immovable else 1e10, immovable, gravity, scale)
+
+        # sleeping bodies skip integration until something touches their island
+        self.sleep_timer = 0
+        self.island = None
+
+        self.model = self.get_model()
+        self.hitbox = None
+        match hitbox_type:
+            case 'cube': self.define_hitbox_cube(vel, rot_vel)
+            case 'rectangle': self.define_hitbox_rectangle(hitbox_file_name, vel, rot_vel)
+            case 'fitted': self.define_hitbox_fitted(hitbox_file_name, vel, rot_vel)
+            # only rendered, the row keeps its model matrix
+            case None: pass
+            case _: assert False, 'hitbox type is not recognized'
+        # local bounds for culling
+        if self.hitbox: self.world.set_bounds(self.index, *self.hitbox.geometry.bounds)
+
+    def get_model(self):
+
+        return BodyModel(self)
+
+    def define_hitbox_cube(self, vel, rot_vel):
+
+        self.hitbox = CubeHitbox(self, vel, rot_vel)
+
+    def define_hitbox_rectangle(self, file_name, vel, rot_vel):
+
+        assert file_name != None, 'hitbox needs file name to be created'
+        self.hitbox = FittedHitbox(self, file_name, True, vel, rot_vel)
+
+    def define_hitbox_fitted(self, file_name, vel, rot_vel):
+
+        assert file_name != None, 'hitbox needs file name to be created'
+        self.hitbox = FittedHitbox(self, file_name, False, vel, rot_vel)
+
+    # for physics
+    def move_tick(self, delta_time):
+
+        self.pos += delta_time * self.hitbox.vel
+        self.rot += delta_time * self.hitbox.rot_vel
+        self.model.update()
+
+    def move_tick_translate(self, delta_time):
+
+        self.pos += delta_time * self.hitbox.vel
+        self.model.update()
+
+    def move_tick_rot(self, delta_time):
+
+        self.rot += delta_time * self.hitbox.rot_vel
+        self.model.update()
+
+    # hands shared hitbox geometry back to the registry, safe to call more than once
+    def release(self):
+
+        if self.hitbox: self.hitbox.release()
+
+    def set_hitbox(self, hitbox):
+
+        self.hitbox = hitbox
+
+    def translate(self, offset):
+
+        self.pos += offset
+        self.model.update()
+
+    def set_pos(self, pos):
+
+        self.pos = pos
+        # teleports are not interpolated
+        self.prev_pos = glm.vec3(pos)
+        self.model.update()
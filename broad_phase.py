@@ -0,0 +1,134 @@
+from math import floor
+from rigid_body_world import IMMOVABLE, SLEEPING
+
+class BroadPhase():
+
+    def __init__(self):
+
+        self.reset_counters()
+
+    def reset_counters(self):
+
+        # number of aabb overlap tests and pairs handed to the narrow phase
+        self.pair_tests = 0
+        self.candidate_pairs = 0
+
+    # yields pairs of objects whose world aabbs overlap
+    def get_pairs(self, objects): ...
+
+    # immovable and sleeping bodies never need to be checked against each other, the flags are read
+    # for every body at once from the packed world rows so pairs only index a list
+    def get_resting(self, objects):
+
+        if not objects: return []
+        flags = objects[0].world.flags[[obj.index for obj in objects]]
+        return ((flags & (IMMOVABLE | SLEEPING)) != 0).tolist()
+
+    def aabbs_overlap(self, aabb1, aabb2):
+
+        self.pair_tests += 1
+        (mins1, maxs1), (mins2, maxs2) = aabb1, aabb2
+        for i in range(3):
+            if maxs1[i] < mins2[i] or maxs2[i] < mins1[i]: return False
+        return True
+
+    def get_stats(self):
+
+        return {'pair_tests' : self.pair_tests, 'candidate_pairs' : self.candidate_pairs}
+
+class BruteForce(BroadPhase):
+
+    # every pair is tested, kept as a reference for benchmarking
+    def get_pairs(self, objects):
+
+        self.reset_counters()
+        aabbs = [obj.hitbox.get_aabb() for obj in objects]
+        resting = self.get_resting(objects)
+        for i in range(len(objects)):
+            for j in range(i + 1, len(objects)):
+                if resting[i] and resting[j]: continue
+                if not self.aabbs_overlap(aabbs[i], aabbs[j]): continue
+
+                self.candidate_pairs += 1
+                yield objects[i], objects[j]
+
+class SweepAndPrune(BroadPhase):
+
+    def get_pairs(self, objects):
+
+        self.reset_counters()
+        if len(objects) < 2: return
+        aabbs = [obj.hitbox.get_aabb() for obj in objects]
+        resting = self.get_resting(objects)
+        axis = self.get_sweep_axis(aabbs)
+
+        # sorts bodies along the axis with the largest spread
+        order = sorted(range(len(objects)), key=lambda i: aabbs[i][0][axis])
+
+        active = []
+        for i in order:
+            mins = aabbs[i][0][axis]
+
+            # drops bodies that ended before this one starts
+            active = [j for j in active if aabbs[j][1][axis] >= mins]
+            for j in active:
+                if resting[i] and resting[j]: continue
+                if not self.aabbs_overlap(aabbs[i], aabbs[j]): continue
+
+                self.candidate_pairs += 1
+                yield objects[j], objects[i]
+            active.append(i)
+
+    # chooses the axis with the highest variance of aabb centers
+    def get_sweep_axis(self, aabbs):
+
+        sums, squares = [0, 0, 0], [0, 0, 0]
+        for mins, maxs in aabbs:
+            for i in range(3):
+                center = (mins[i] + maxs[i]) / 2
+                sums[i] += center
+                squares[i] += center * center
+        variances = [squares[i] - sums[i] * sums[i] / len(aabbs) for i in range(3)]
+        return variances.index(max(variances))
+
+class SpatialHash(BroadPhase):
+
+    def __init__(self, cell_size = 4):
+
+        super().__init__()
+        self.cell_size = cell_size
+
+    def get_cell_range(self, aabb):
+
+        mins, maxs = aabb
+        return [range(floor(mins[i] / self.cell_size), floor(maxs[i] / self.cell_size) + 1) for i in range(3)]
+
+    def get_pairs(self, objects):
+
+        self.reset_counters()
+        aabbs = [obj.hitbox.get_aabb() for obj in objects]
+        resting = self.get_resting(objects)
+
+        # inserts every body into each cell its aabb touches
+        cells = {}
+        for i, aabb in enumerate(aabbs):
+            xs, ys, zs = self.get_cell_range(aabb)
+            for x in xs:
+                for y in ys:
+                    for z in zs:
+                        cells.setdefault((x, y, z), []).append(i)
+
+        # bodies sharing several cells are only tested once
+        tested = set()
+        for cell in cells.values():
+            for a in range(len(cell)):
+                for b in range(a + 1, len(cell)):
+                    i, j = cell[a], cell[b]
+                    if (i, j) in tested: continue
+                    tested.add((i, j))
+
+                    if resting[i] and resting[j]: continue
+                    if not self.aabbs_overlap(aabbs[i], aabbs[j]): continue
+
+                    self.candidate_pairs += 1
+                    yield objects[i], objects[j]
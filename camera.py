@@ -1,4 +1,5 @@
 import glm
+import numpy as np
 import pygame as pg
 
 
@@ -67,5 +68,9 @@ class Camera:
     def get_view_matrix(self):
         return glm.lookAt(self.position, self.position + self.forward, self.up)
 
+    # Pixels a size covers on screen at a view distance, works on arrays of sizes and distances
+    def get_projected_size(self, size, distance):
+        return size * self.m_proj[1][1] * self.app.win_size[1] / 2 / np.maximum(distance, NEAR)
+
     def get_projection_matrix(self):
         return glm.perspective(glm.radians(FOV), self.aspect_ratio, NEAR, FAR)
\ No newline at end of file
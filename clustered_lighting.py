@@ -0,0 +1,138 @@
+import numpy as np
+import moderngl as mgl
+
+# Texture units, 1 and 2 are materials and 3 is the shadow map
+LIGHT_DATA_UNIT = 4
+CLUSTER_GRID_UNIT = 5
+LIGHT_INDICES_UNIT = 6
+# Width of the light index texture, rows are added as the list grows
+INDEX_ROW = 4096
+
+
+class ClusteredLighting:
+    def __init__(self, ctx, win_size, near, far, tiles=(16, 9), slices=24, max_lights=1024, threshold=1 / 256):
+        self.ctx = ctx
+        self.win_size = win_size
+        self.near, self.far = near, far
+        self.tiles = tiles
+        self.slices = slices
+        self.max_lights = max_lights
+        # Lights are cut off where their attenuated intensity falls below this
+        self.threshold = threshold
+        self.clusters = tiles[0] * tiles[1] * slices
+        # Exponential depth slices, slice = log(depth) * scale + bias
+        self.depth_scale = slices / np.log(far / near)
+        self.depth_bias = -slices * np.log(near) / np.log(far / near)
+
+        # 3 texels per light: (pos, constant), (color, linear), (quadratic, ambient, diffuse, specular)
+        self.light_data = self.ctx.texture((3, max_lights), 4, dtype='f4')
+        # (first index, count) per cluster, tiles along x and depth slices along y
+        self.cluster_grid = self.ctx.texture((tiles[0] * tiles[1], slices), 2, dtype='u4')
+        self.light_indices = self.ctx.texture((INDEX_ROW, 1), 1, dtype='u4')
+        for texture in (self.light_data, self.cluster_grid, self.light_indices):
+            # Integer textures cannot be filtered
+            texture.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        # Per frame stats
+        self.lights = 0
+        self.assignments = 0
+
+    def bind_programs(self, programs):
+        for program in programs.values():
+            self.bind_program(program)
+
+    # Sampler units and grid constants for programs compiled with clustered lighting
+    def bind_program(self, program):
+        if 'u_cluster_grid' not in program:
+            return
+        program['u_light_data'] = LIGHT_DATA_UNIT
+        program['u_cluster_grid'] = CLUSTER_GRID_UNIT
+        program['u_light_indices'] = LIGHT_INDICES_UNIT
+        program['u_cluster_dims'] = (*self.tiles, self.slices)
+        program['u_tile_size'] = (self.win_size[0] / self.tiles[0], self.win_size[1] / self.tiles[1])
+        program['u_depth_scale_bias'] = (self.depth_scale, self.depth_bias)
+
+    # Distance at which each light's attenuation brings it under the threshold
+    def get_radii(self, data):
+        constant, linear, quadratic = data[:, 3], data[:, 7], data[:, 8]
+        intensity = data[:, 4:7].max(axis=1) * data[:, 9:12].max(axis=1)
+        # Solves quadratic * r^2 + linear * r + constant = intensity / threshold
+        target = np.maximum(intensity / self.threshold - constant, 0)
+        return np.where(quadratic > 0, (-linear + np.sqrt(linear ** 2 + 4 * quadratic * target)) / (2 * np.maximum(quadratic, 1e-12)),
+                        target / np.maximum(linear, 1e-12))
+
+    def update(self, camera, light_handler):
+        data = light_handler.get_point_light_data()[:self.max_lights]
+        self.lights = len(data)
+        cluster_ids, light_ids = self.assign_lights(data, camera.m_view, camera.m_proj)
+
+        # Each cluster keeps the first index and the count of its run of lights
+        counts = np.bincount(cluster_ids, minlength=self.clusters).astype('u4')
+        grid = np.zeros((self.clusters, 2), dtype='u4')
+        grid[1:, 0] = np.cumsum(counts)[:-1]
+        grid[:, 1] = counts
+        self.assignments = len(light_ids)
+
+        if len(data):
+            self.light_data.write(np.ascontiguousarray(data, dtype='f4'), viewport=(0, 0, 3, len(data)))
+        self.cluster_grid.write(grid)
+        self.write_indices(light_ids.astype('u4'))
+
+        self.light_data.use(location=LIGHT_DATA_UNIT)
+        self.cluster_grid.use(location=CLUSTER_GRID_UNIT)
+        self.light_indices.use(location=LIGHT_INDICES_UNIT)
+
+    def write_indices(self, indices):
+        rows = max(1, -(-len(indices) // INDEX_ROW))
+        if rows > self.light_indices.height:
+            self.light_indices.release()
+            self.light_indices = self.ctx.texture((INDEX_ROW, rows), 1, dtype='u4')
+            self.light_indices.filter = (mgl.NEAREST, mgl.NEAREST)
+        padded = np.zeros(rows * INDEX_ROW, dtype='u4')
+        padded[:len(indices)] = indices
+        self.light_indices.write(padded, viewport=(0, 0, INDEX_ROW, rows))
+
+    # Returns (cluster, light) pairs for every cluster each light's bounding box touches
+    def assign_lights(self, data, m_view, m_proj):
+        if not len(data):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        view = np.array(m_view, dtype='f8')  # Row major math view
+        centers = data[:, :3] @ view[:3, :3].T + view[:3, 3]
+        radii = self.get_radii(data)
+
+        # View space depth along -z
+        near_depth = np.maximum(-centers[:, 2] - radii, self.near)
+        far_depth = np.minimum(-centers[:, 2] + radii, self.far)
+        in_range = near_depth <= far_depth
+        slice_min = np.clip(np.floor(np.log(near_depth) * self.depth_scale + self.depth_bias), 0, self.slices - 1)
+        slice_max = np.clip(np.floor(np.log(np.maximum(far_depth, self.near)) * self.depth_scale + self.depth_bias), 0, self.slices - 1)
+
+        # Screen bounds of the box around the sphere, lights reaching the near plane cover the whole screen
+        projection = np.array(m_proj, dtype='f8')
+        crosses_near = -centers[:, 2] - radii <= self.near
+        tile_min, tile_max = [], []
+        for axis, scale, tiles in ((0, projection[0, 0], self.tiles[0]), (1, projection[1, 1], self.tiles[1])):
+            edges = np.stack([centers[:, axis] - radii, centers[:, axis] + radii], axis=1)
+            ndc = scale * edges[:, :, None] / np.stack([near_depth, far_depth], axis=1)[:, None, :]
+            ndc_min = np.where(crosses_near, -1, ndc.min(axis=(1, 2)))
+            ndc_max = np.where(crosses_near, 1, ndc.max(axis=(1, 2)))
+            in_range &= (ndc_max >= -1) & (ndc_min <= 1)
+            tile_min.append(np.clip(np.floor((ndc_min + 1) / 2 * tiles), 0, tiles - 1))
+            tile_max.append(np.clip(np.floor((ndc_max + 1) / 2 * tiles), 0, tiles - 1))
+
+        # Per axis masks of the lights covering each tile column, row and slice, combined into a (cluster, light) mask
+        masks = []
+        for low, high, count in ((slice_min, slice_max, self.slices), (tile_min[1], tile_max[1], self.tiles[1]), (tile_min[0], tile_max[0], self.tiles[0])):
+            cells = np.arange(count)[:, None]
+            masks.append((low <= cells) & (cells <= high) & in_range)
+        covered = masks[0][:, None, None, :] & masks[1][None, :, None, :] & masks[2][None, None, :, :]
+        # Cluster major order, so every cluster's lights form one run
+        return np.nonzero(covered.reshape(self.clusters, len(data)))
+
+    def get_stats(self):
+        return {'lights': self.lights, 'clusters': self.clusters, 'assignments': self.assignments}
+
+    def destroy(self):
+        self.light_data.release()
+        self.cluster_grid.release()
+        self.light_indices.release()
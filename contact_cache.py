@@ -0,0 +1,122 @@
+import glm
+
+class CachedContact():
+
+    def __init__(self):
+
+        # axis that separated the pair last time, or the contact from the last collision
+        self.separating_axis = None
+        self.normal = None
+        self.simplex = None
+        self.contact = None
+        self.frame = 0
+
+class ContactCache():
+
+    def __init__(self):
+
+        self.entries = {}
+        self.frame = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+
+        self.lookups = 0
+        self.warm_starts = 0
+        self.early_outs = 0
+
+    def begin_frame(self):
+
+        self.frame += 1
+        self.reset_stats()
+
+    # forgets pairs that were not tested this frame
+    def end_frame(self):
+
+        self.entries = {key : entry for key, entry in self.entries.items() if entry.frame == self.frame}
+
+    # pairs are keyed on their world rows independent of order, so keys mean the same in every process,
+    # axes are stored relative to the first body of the key
+    def get_key(self, obj1, obj2):
+
+        return self.get_index_key(obj1.index, obj2.index)
+
+    @staticmethod
+    def get_index_key(index1, index2):
+
+        return (index1, index2) if index1 < index2 else (index2, index1)
+
+    def get_sign(self, obj1, obj2):
+
+        return 1 if obj1.index < obj2.index else -1
+
+    def get_entry(self, obj1, obj2):
+
+        key = self.get_key(obj1, obj2)
+        if key not in self.entries: self.entries[key] = CachedContact()
+        entry = self.entries[key]
+        entry.frame = self.frame
+        return entry
+
+    # direction to seed gjk with, either last frame's separating axis or contact normal
+    def get_start_vector(self, obj1, obj2):
+
+        self.lookups += 1
+        entry = self.entries.get(self.get_key(obj1, obj2))
+        if not entry: return None
+
+        sign = self.get_sign(obj1, obj2)
+        if entry.separating_axis is not None:
+            self.warm_starts += 1
+            return entry.separating_axis * sign
+        if entry.normal is not None:
+            # gjk searches the minkowski difference against the contact normal first
+            self.warm_starts += 1
+            return entry.normal * -sign
+        return None
+
+    def store_separation(self, obj1, obj2, separating_axis, early_out = False):
+
+        entry = self.get_entry(obj1, obj2)
+        entry.separating_axis = separating_axis * self.get_sign(obj1, obj2) if separating_axis is not None else None
+        entry.normal, entry.simplex, entry.contact = None, None, None
+        if early_out: self.early_outs += 1
+
+    def store_contact(self, obj1, obj2, simplex, contact):
+
+        entry = self.get_entry(obj1, obj2)
+        entry.separating_axis = None
+        entry.normal = contact.normal * self.get_sign(obj1, obj2) if contact else None
+        entry.simplex, entry.contact = simplex, contact
+
+    # (separating axis, normal) as tuples of the cached pairs among keys, to hand them to another process
+    def get_entries(self, keys):
+
+        entries = {}
+        for key in keys:
+            entry = self.entries.get(key)
+            if not entry: continue
+            entries[key] = (tuple(entry.separating_axis) if entry.separating_axis is not None else None,
+                            tuple(entry.normal) if entry.normal is not None else None)
+        return entries
+
+    # takes entries from get_entries as tested this frame
+    def set_entries(self, entries):
+
+        for key, (separating_axis, normal) in entries.items():
+            entry = self.entries[key] = CachedContact()
+            entry.separating_axis = glm.vec3(separating_axis) if separating_axis is not None else None
+            entry.normal = glm.vec3(normal) if normal is not None else None
+            entry.frame = self.frame
+
+    def add_stats(self, lookups, warm_starts, early_outs):
+
+        self.lookups += lookups
+        self.warm_starts += warm_starts
+        self.early_outs += early_outs
+
+    def get_stats(self):
+
+        return {'lookups' : self.lookups, 'warm_starts' : self.warm_starts, 'early_outs' : self.early_outs,
+                'warm_start_hit_rate' : self.warm_starts / self.lookups if self.lookups else 0,
+                'early_out_rate' : self.early_outs / self.warm_starts if self.warm_starts else 0}
@@ -0,0 +1,124 @@
+import glm
+import numpy as np
+from gjk import GJK
+from profiler import profiler
+
+class SweptGJK(GJK):
+
+    # gjk against the volume the swept hitbox covers while moving by offset, the other hitbox stays put
+    def __init__(self):
+
+        super().__init__()
+        self.swept = None
+        self.offset = glm.vec3(0)
+
+    # support of the hull of the shape at the start and end of the sweep
+    def get_furthest_point(self, hitbox, vec):
+
+        point = super().get_furthest_point(hitbox, vec)
+        if hitbox is self.swept and glm.dot(self.offset, vec) > 0: return point + self.offset
+        return point
+
+class ContinuousCollision():
+
+    # bodies moving further than threshold times their smallest dimension in one step are swept against what lies in their path
+    def __init__(self, threshold = 0.25, iterations = 8):
+
+        self.threshold = threshold
+
+        # bisection steps on the time of impact, the body ends at most 1 / 2^iterations of its step inside the other
+        self.iterations = iterations
+        self.gjk = SweptGJK()
+
+        # counters for benchmarking
+        self.swept_bodies = 0
+        self.sweep_tests = 0
+        self.impacts = 0
+
+    # gjk of hitbox1 moving by offset against hitbox2 as (overlapping, separated),
+    # near parallel faces can run gjk out of iterations with neither
+    def sweep(self, hitbox1, hitbox2, offset):
+
+        self.sweep_tests += 1
+        self.gjk.swept, self.gjk.offset = hitbox1, offset
+        collided = self.gjk.get_gjk_collision(hitbox1, hitbox2)[0]
+        return collided, self.gjk.separating_axis is not None
+
+    # fraction of the step at which hitbox1 moving by displacement first overlaps hitbox2, None if it misses or overlaps already
+    def get_time_of_impact(self, hitbox1, hitbox2, displacement):
+
+        # overlaps at the start are left to the narrow phase
+        if self.sweep(hitbox1, hitbox2, glm.vec3(0))[0]: return None
+        if self.sweep(hitbox1, hitbox2, displacement)[1]: return None
+
+        # the body only advances as far as a sweep proves clear
+        low, high = 0, 1
+        for i in range(self.iterations):
+            middle = (low + high) / 2
+            if self.sweep(hitbox1, hitbox2, displacement * middle)[1]: low = middle
+            else: high = middle
+        return high
+
+    # world aabbs as (mins, maxs) from the local bounds and model matrices of the first n rows
+    def get_world_aabbs(self, world, n):
+
+        centers, extents = (world.bound_min[:n] + world.bound_max[:n]) / 2, (world.bound_max[:n] - world.bound_min[:n]) / 2
+        rotation = world.model_matrix[:n, :3, :3]
+        centers = np.einsum('nj,nji->ni', centers, rotation) + world.model_matrix[:n, 3, :3]
+        extents = np.einsum('nj,nji->ni', extents, np.abs(rotation))
+        return centers - extents, centers + extents
+
+    # called before integration, returns (index, other index, time of impact) of every fast body that would pass into another this step,
+    # only the stepped bodies are swept or swept against
+    @profiler.profile('continuous_collision')
+    def get_impacts(self, world, delta_time, bodies):
+
+        self.swept_bodies, self.sweep_tests, self.impacts = 0, 0, 0
+        n = world.count
+        stepped = np.zeros(n, dtype=bool)
+        stepped[[body.index for body in bodies]] = True
+        displacements = np.where(world.get_awake_mask()[:, None], world.vel[:n] * np.float32(delta_time), np.float32(0))
+
+        # the hitbox dimensions, from the packed local bounds and scales
+        sizes = ((world.bound_max[:n] - world.bound_min[:n]) * np.abs(world.scale[:n])).min(axis=1)
+        fast = np.flatnonzero(stepped & (np.linalg.norm(displacements, axis=1) > self.threshold * sizes))
+        self.swept_bodies = len(fast)
+        if not len(fast): return []
+
+        world.update_model_matrices()
+        mins, maxs = self.get_world_aabbs(world, n)
+        impacts = []
+        for index in fast.tolist():
+            displacement = displacements[index]
+
+            # bodies whose bounds touch the bounds of the whole sweep, relative motion is ignored at this stage
+            low, high = mins[index] + np.minimum(displacement, 0), maxs[index] + np.maximum(displacement, 0)
+            candidates = np.flatnonzero(stepped & (mins <= high).all(axis=1) & (maxs >= low).all(axis=1))
+
+            body, first = world.bodies[index], None
+            for other in candidates.tolist():
+                if other == index: continue
+                time = self.get_time_of_impact(body.hitbox, world.bodies[other].hitbox, glm.vec3(*(displacement - displacements[other])))
+                if time is not None and (first is None or time < first[1]): first = (other, time)
+            if first: impacts.append((index, *first))
+
+        self.impacts = len(impacts)
+        if profiler.enabled: profiler.count('impacts', self.impacts)
+        return impacts
+
+    # called after integration, pulls each body back to its time of impact, rotation still advances the full step
+    def apply_impacts(self, world, impacts):
+
+        for index, other, time in impacts:
+            body, displacement = world.bodies[index], world.pos[index] - world.prev_pos[index]
+            body.pos = glm.vec3(*(world.prev_pos[index] + np.float32(time) * displacement))
+            body.model.update()
+
+            # the approach along the path is stopped, the contact may be too shallow for the narrow phase to do it
+            direction = glm.normalize(glm.vec3(*(displacement - (world.pos[other] - world.prev_pos[other]))))
+            approach = glm.dot(body.vel - world.bodies[other].vel, direction)
+            if approach > 0: body.vel = body.vel - approach * direction
+
+    def get_stats(self):
+
+        return {'swept_bodies' : self.swept_bodies, 'sweep_tests' : self.sweep_tests, 'impacts' : self.impacts}
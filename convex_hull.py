@@ -0,0 +1,153 @@
+import numpy as np
+
+class ConvexHull():
+
+    # builds the hull of an (n, 3) point cloud, optionally decimated to at most max_vertices points
+    def __init__(self, points, max_vertices = None):
+
+        points = np.unique(np.asarray(points, dtype='f8').reshape(-1, 3), axis=0)
+        if max_vertices and len(points) > max_vertices: points = self.decimate(points, max_vertices)
+
+        # tolerance relative to the size of the model
+        self.eps = 1e-9 + 1e-7 * np.abs(points).max()
+
+        vertex_indices, faces = self.quickhull(points)
+
+        # reindexes faces onto the hull vertices only
+        remap = {index : i for i, index in enumerate(vertex_indices)}
+        self.vertices = np.ascontiguousarray(points[vertex_indices], dtype='f4')
+        self.faces = [tuple(remap[i] for i in face) for face in faces]
+        self.adjacency = self.get_adjacency()
+
+    # keeps the extreme points along evenly spread directions, which preserves the silhouette
+    def decimate(self, points, count):
+
+        # fibonacci sphere directions
+        i = np.arange(count) + 0.5
+        phi = np.arccos(1 - 2 * i / count)
+        theta = np.pi * (1 + 5 ** 0.5) * i
+        directions = np.stack([np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)], axis=1)
+
+        # chunked so the (points, directions) product stays small
+        extremes = set()
+        for start in range(0, count, 64):
+            extremes.update(np.argmax(points @ directions[start:start + 64].T, axis=0).tolist())
+        return points[sorted(extremes)]
+
+    # vertex neighbours along hull edges, used for hill climbing support queries
+    def get_adjacency(self):
+
+        neighbours = [set() for i in range(len(self.vertices))]
+        for a, b, c in self.faces:
+            neighbours[a].update((b, c))
+            neighbours[b].update((a, c))
+            neighbours[c].update((a, b))
+        return [sorted(vertex) for vertex in neighbours]
+
+    def get_initial_simplex(self, points):
+
+        # two extreme points along the widest axis
+        axis = np.argmax(points.max(axis=0) - points.min(axis=0))
+        i0, i1 = int(np.argmin(points[:, axis])), int(np.argmax(points[:, axis]))
+
+        # point furthest from the line
+        line = points[i1] - points[i0]
+        distances = np.linalg.norm(np.cross(points - points[i0], line), axis=1)
+        i2 = int(np.argmax(distances))
+        if distances[i2] <= self.eps: raise ValueError('points are collinear')
+
+        # point furthest from the plane
+        normal = np.cross(line, points[i2] - points[i0])
+        distances = np.abs((points - points[i0]) @ normal) / np.linalg.norm(normal)
+        i3 = int(np.argmax(distances))
+        if distances[i3] <= self.eps: raise ValueError('points are coplanar')
+
+        return i0, i1, i2, i3
+
+    def quickhull(self, points):
+
+        simplex = self.get_initial_simplex(points)
+        center = points[list(simplex)].mean(axis=0)
+
+        # face id -> [vertex indices, normal, offset, outside point indices]
+        self.hull_faces = {}
+        self.edges = {}
+        self.next_face = 0
+
+        i0, i1, i2, i3 = simplex
+        new_faces = [self.add_face(points, face, center) for face in ((i0, i1, i2), (i0, i2, i3), (i0, i3, i1), (i1, i3, i2))]
+        remaining = np.setdiff1d(np.arange(len(points)), simplex)
+        self.assign_points(points, remaining, new_faces)
+
+        pending = [face_id for face_id in new_faces if len(self.hull_faces[face_id][3])]
+        while pending:
+            face_id = pending.pop()
+            if face_id not in self.hull_faces or not len(self.hull_faces[face_id][3]): continue
+            face, normal, offset, outside = self.hull_faces[face_id]
+
+            # furthest outside point becomes the new hull vertex
+            eye = int(outside[np.argmax(points[outside] @ normal - offset)])
+
+            # floods across every face that can see the eye point
+            visible, stack = {face_id}, [face_id]
+            while stack:
+                for a, b in self.get_face_edges(self.hull_faces[stack.pop()][0]):
+                    neighbour = self.edges[(b, a)]
+                    if neighbour in visible: continue
+                    neighbour_face, neighbour_normal, neighbour_offset, neighbour_outside = self.hull_faces[neighbour]
+                    if points[eye] @ neighbour_normal - neighbour_offset > self.eps:
+                        visible.add(neighbour)
+                        stack.append(neighbour)
+
+            # edges between visible and hidden faces form the horizon
+            horizon = [(a, b) for visible_id in visible for a, b in self.get_face_edges(self.hull_faces[visible_id][0]) if self.edges[(b, a)] not in visible]
+
+            orphans = np.concatenate([self.hull_faces[visible_id][3] for visible_id in visible])
+            for visible_id in visible: self.remove_face(visible_id)
+
+            new_faces = [self.add_face(points, (a, b, eye), center) for a, b in horizon]
+            self.assign_points(points, orphans[orphans != eye], new_faces)
+            pending.extend(face_id for face_id in new_faces if len(self.hull_faces[face_id][3]))
+
+        faces = [face[0] for face in self.hull_faces.values()]
+        return sorted({i for face in faces for i in face}), faces
+
+    def get_face_edges(self, face):
+
+        a, b, c = face
+        return (a, b), (b, c), (c, a)
+
+    def add_face(self, points, face, center):
+
+        a, b, c = face
+        normal = np.cross(points[b] - points[a], points[c] - points[a])
+        normal /= np.linalg.norm(normal)
+
+        # keeps every face wound counter clockwise when seen from outside
+        if (points[a] - center) @ normal < 0:
+            face, normal = (a, c, b), -normal
+
+        face_id = self.next_face
+        self.next_face += 1
+        self.hull_faces[face_id] = [face, normal, points[face[0]] @ normal, np.empty(0, dtype=int)]
+        for edge in self.get_face_edges(face): self.edges[edge] = face_id
+        return face_id
+
+    def remove_face(self, face_id):
+
+        for edge in self.get_face_edges(self.hull_faces[face_id][0]):
+            if self.edges.get(edge) == face_id: del self.edges[edge]
+        del self.hull_faces[face_id]
+
+    # gives each point to the face it lies furthest outside of, points inside the hull are dropped
+    def assign_points(self, points, indices, face_ids):
+
+        if not len(indices) or not face_ids: return
+        normals = np.array([self.hull_faces[face_id][1] for face_id in face_ids])
+        offsets = np.array([self.hull_faces[face_id][2] for face_id in face_ids])
+        distances = points[indices] @ normals.T - offsets
+
+        best = np.argmax(distances, axis=1)
+        outside = distances[np.arange(len(indices)), best] > self.eps
+        for i, face_id in enumerate(face_ids):
+            self.hull_faces[face_id][3] = indices[outside & (best == i)]
@@ -0,0 +1,207 @@
+import time
+import numpy as np
+
+# classification of a box against a frustum
+OUTSIDE = 0
+INTERSECTING = 1
+INSIDE = 2
+
+class Frustum():
+
+    # six inward facing planes (a, b, c, d) of a projection * view matrix, points with a*x + b*y + c*z + d >= 0 are inside
+    def __init__(self, m_proj_view):
+
+        rows = np.array(m_proj_view, dtype='f8') # row major math view of the glm matrix
+        planes = np.array([rows[3] + rows[0], rows[3] - rows[0], rows[3] + rows[1], rows[3] - rows[1], rows[3] + rows[2], rows[3] - rows[2]])
+        self.planes = planes / np.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+    # classifies (n, 3) boxes given by center and half extents
+    def classify(self, centers, extents):
+
+        normals, offsets = self.planes[:, :3], self.planes[:, 3]
+        distances = centers @ normals.T + offsets
+        radii = extents @ np.abs(normals).T
+
+        result = np.full(len(centers), INTERSECTING, dtype='u1')
+        result[(distances - radii >= 0).all(axis=1)] = INSIDE
+        result[(distances + radii < 0).any(axis=1)] = OUTSIDE
+        return result
+
+class BVH():
+
+    # implicit binary tree over bodies sorted along a morton curve, leaves hold leaf_size bodies
+    def __init__(self, leaf_size = 8, rebuild_ratio = 2, brute_force_count = 4096):
+
+        self.leaf_size = leaf_size
+
+        # below this many bodies testing every body costs less than keeping the tree
+        self.brute_force_count = brute_force_count
+        # refits touching fewer than 1 / partial_refit_ratio of the bodies only walk up from their leaves
+        self.partial_refit_ratio = 8
+
+        # refitted trees get looser as bodies move apart, past this growth in leaf surface area the tree is rebuilt
+        self.rebuild_ratio = rebuild_ratio
+
+        self.count = 0
+        self.leaves = 0
+        self.order = np.zeros(0, dtype=int)
+        self.built_area = 0
+
+        # counters for benchmarking
+        self.builds = 0
+        self.refits = 0
+        self.node_tests = 0
+        self.cull_time = 0
+
+    # world aabbs as centers and half extents from the local bounds and (n, 4, 4) column major matrices
+    def get_world_bounds(self, matrices, local_min, local_max):
+
+        centers, extents = (local_min + local_max) / 2, (local_max - local_min) / 2
+        rotation = matrices[:, :3, :3]
+        world_centers = np.einsum('nj,nji->ni', centers, rotation) + matrices[:, 3, :3]
+        world_extents = np.einsum('nj,nji->ni', extents, np.abs(rotation))
+        return world_centers, world_extents
+
+    def update(self, matrices, local_min, local_max):
+
+        centers, extents = self.get_world_bounds(matrices, local_min, local_max)
+        if len(centers) < self.brute_force_count:
+            self.centers, self.extents, self.count, self.leaves = centers, extents, len(centers), 0
+            return
+
+        if len(centers) != self.count or not self.leaves:
+            self.centers, self.extents = centers, extents
+            self.build()
+            return
+
+        # only leaves holding bodies whose bounds changed are refit
+        changed = np.flatnonzero((centers != self.centers).any(axis=1) | (extents != self.extents).any(axis=1))
+        self.centers, self.extents = centers, extents
+        self.refit(changed)
+        if self.get_leaf_area() > self.rebuild_ratio * self.built_area: self.build()
+
+    # sorts bodies by the morton code of their centers, nearby bodies end up in the same leaves
+    def build(self):
+
+        self.builds += 1
+        self.count = len(self.centers)
+        self.leaves = max(1, 1 << int(np.ceil(np.log2(max(1, -(-self.count // self.leaf_size))))))
+        self.depth = int(np.log2(self.leaves))
+
+        mins, maxs = self.centers.min(axis=0), self.centers.max(axis=0)
+        cells = ((self.centers - mins) / np.maximum(maxs - mins, 1e-9) * 1023).astype(np.uint64)
+        self.order = np.argsort(self.get_morton_codes(cells), kind='stable')
+        self.rank = np.empty(self.count, dtype=int)
+        self.rank[self.order] = np.arange(self.count)
+        self.filled_leaves = -(-self.count // self.leaf_size)
+
+        # padded leaves keep empty bounds, which min and max merges into their parents ignore
+        self.node_min = np.full((2 * self.leaves - 1, 3), np.inf)
+        self.node_max = np.full((2 * self.leaves - 1, 3), -np.inf)
+        self.refit()
+        self.built_area = self.get_leaf_area()
+
+    def get_morton_codes(self, cells):
+
+        codes = np.zeros(len(cells), dtype=np.uint64)
+        for bit in range(10):
+            for axis in range(3):
+                codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+        return codes
+
+    # recomputes node bounds bottom up with the tree shape unchanged, from the changed bodies' leaves or from all of them
+    def refit(self, changed = None):
+
+        self.refits += 1
+        if changed is not None and len(changed) * self.partial_refit_ratio < self.count: return self.refit_leaves(changed)
+        mins = (self.centers - self.extents)[self.order]
+        maxs = (self.centers + self.extents)[self.order]
+
+        # heap layout, leaves are the last level
+        first_leaf = self.leaves - 1
+        starts = np.arange(self.filled_leaves) * self.leaf_size
+        self.node_min[first_leaf:first_leaf + len(starts)] = np.minimum.reduceat(mins, starts)
+        self.node_max[first_leaf:first_leaf + len(starts)] = np.maximum.reduceat(maxs, starts)
+
+        for level in range(self.depth - 1, -1, -1):
+            nodes = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+            self.merge_children(nodes)
+
+    # refits only the leaves holding the given bodies and their ancestors
+    def refit_leaves(self, changed):
+
+        leaves = np.unique(self.rank[changed] // self.leaf_size)
+        if not len(leaves): return
+
+        # sorted positions of each leaf's bodies, short last leaves repeat their final body
+        bodies = self.order[np.minimum(leaves[:, None] * self.leaf_size + np.arange(self.leaf_size), self.count - 1)]
+        nodes = leaves + self.leaves - 1
+        self.node_min[nodes] = (self.centers[bodies] - self.extents[bodies]).min(axis=1)
+        self.node_max[nodes] = (self.centers[bodies] + self.extents[bodies]).max(axis=1)
+
+        for level in range(self.depth):
+            nodes = np.unique((nodes - 1) // 2)
+            self.merge_children(nodes)
+
+    def merge_children(self, nodes):
+
+        self.node_min[nodes] = np.minimum(self.node_min[2 * nodes + 1], self.node_min[2 * nodes + 2])
+        self.node_max[nodes] = np.maximum(self.node_max[2 * nodes + 1], self.node_max[2 * nodes + 2])
+
+    def get_leaf_area(self):
+
+        first_leaf = self.leaves - 1
+        sizes = self.node_max[first_leaf:first_leaf + self.filled_leaves] - self.node_min[first_leaf:first_leaf + self.filled_leaves]
+        return float((sizes[:, 0] * sizes[:, 1] + sizes[:, 1] * sizes[:, 2] + sizes[:, 2] * sizes[:, 0]).sum())
+
+    # boolean mask of the bodies whose bounds touch the frustum
+    def cull(self, frustum):
+
+        start = time.perf_counter()
+        self.node_tests = 0
+        if not self.leaves:
+            self.node_tests = self.count
+            visible = frustum.classify(self.centers, self.extents) != OUTSIDE
+            self.cull_time = time.perf_counter() - start
+            return visible
+
+        # +1 / -1 at the first and past the last accepted leaf of every subtree, summed into a leaf mask
+        accepted = np.zeros(self.leaves + 1, dtype=int)
+        active = np.zeros(1 if self.count else 0, dtype=int)
+        for level in range(self.depth + 1):
+
+            # subtrees made only of padded leaves are empty
+            active = active[self.node_min[active, 0] <= self.node_max[active, 0]]
+            if not len(active): break
+            self.node_tests += len(active)
+            state = frustum.classify((self.node_min[active] + self.node_max[active]) / 2, (self.node_max[active] - self.node_min[active]) / 2)
+
+            # whole subtrees inside the frustum are accepted without testing their children
+            inside = active[state == INSIDE]
+            if len(inside):
+                span = self.leaves >> level
+                first = (inside - ((1 << level) - 1)) * span
+                np.add.at(accepted, first, 1)
+                np.add.at(accepted, first + span, -1)
+
+            active = active[state == INTERSECTING]
+            if level < self.depth: active = np.concatenate([2 * active + 1, 2 * active + 2])
+
+        # bodies in leaves crossing a frustum plane are tested one by one
+        sorted_visible = np.repeat(np.cumsum(accepted[:-1]) > 0, self.leaf_size)[:self.count]
+        if len(active):
+            crossing = np.zeros(self.leaves, dtype=bool)
+            crossing[active - (self.leaves - 1)] = True
+            positions = np.flatnonzero(np.repeat(crossing, self.leaf_size)[:self.count])
+            bodies = self.order[positions]
+            sorted_visible[positions] = frustum.classify(self.centers[bodies], self.extents[bodies]) != OUTSIDE
+
+        visible = np.zeros(self.count, dtype=bool)
+        visible[self.order] = sorted_visible
+        self.cull_time = time.perf_counter() - start
+        return visible
+
+    def get_stats(self, visible):
+
+        return {'visible' : int(visible.sum()), 'total' : self.count, 'cull_ms' : self.cull_time * 1e3,
+                'node_tests' : self.node_tests, 'builds' : self.builds}
@@ -0,0 +1,94 @@
+import glm
+from gjk import GJK
+
+class Contact():
+
+    def __init__(self, normal, depth, point1, point2):
+
+        # normal points from the first hitbox towards the second
+        self.normal = normal
+        self.depth = depth
+
+        # deepest points on each hitbox in world space
+        self.point1 = point1
+        self.point2 = point2
+
+class EPA():
+
+    def __init__(self, gjk = None):
+
+        # support queries are shared with gjk
+        self.gjk = gjk if gjk else GJK()
+        self.iterations = 0
+
+    # expands the terminating gjk simplex until the face closest to the origin is on the minkowski boundary
+    def get_contact(self, hitbox1, hitbox2, simplex, tolerance = 1e-4, max_iterations = 64):
+
+        self.polytope = list(simplex)
+        self.faces = [self.get_face(0, 1, 2), self.get_face(0, 3, 1), self.get_face(0, 2, 3), self.get_face(1, 3, 2)]
+
+        for self.iterations in range(1, max_iterations + 1):
+            closest = min(self.faces, key=lambda face: face[2])
+            face, normal, distance = closest
+            if normal is None: return None
+
+            # stops once the polytope cannot grow any further towards the normal
+            support = self.gjk.get_support_point(hitbox1, hitbox2, normal)
+            if glm.dot(support[0], normal) - distance < tolerance: break
+
+            self.expand(support)
+        return self.get_face_contact(face, normal, distance)
+
+    # adds the support point and rebuilds every face it can see
+    def expand(self, support):
+
+        self.polytope.append(support)
+        point, index = support[0], len(self.polytope) - 1
+
+        edges = {}
+        kept = []
+        for face in self.faces:
+            vertices, normal, distance = face
+            if normal is not None and glm.dot(normal, point - self.polytope[vertices[0]][0]) <= 0:
+                kept.append(face)
+                continue
+
+            # edges shared by two removed faces are interior and cancel out
+            for a, b in ((vertices[0], vertices[1]), (vertices[1], vertices[2]), (vertices[2], vertices[0])):
+                if (b, a) in edges: del edges[(b, a)]
+                else: edges[(a, b)] = True
+
+        self.faces = kept + [self.get_face(a, b, index) for a, b in edges]
+
+    # face as (vertex indices, outward normal, distance from origin)
+    def get_face(self, a, b, c):
+
+        point_a, point_b, point_c = self.polytope[a][0], self.polytope[b][0], self.polytope[c][0]
+        normal = glm.cross(point_b - point_a, point_c - point_a)
+
+        # degenerate faces are never chosen as closest
+        if glm.length(normal) < 1e-12: return (a, b, c), None, float('inf')
+        normal = glm.normalize(normal)
+
+        # origin is inside the polytope, so outward normals point away from it
+        if glm.dot(normal, point_a) < 0: return (a, c, b), -normal, -glm.dot(normal, point_a)
+        return (a, b, c), normal, glm.dot(normal, point_a)
+
+    # projects the origin onto the closest face and maps it back onto both hitboxes
+    def get_face_contact(self, face, normal, distance):
+
+        (point_a, (a1, a2)), (point_b, (b1, b2)), (point_c, (c1, c2)) = [self.polytope[i] for i in face]
+        u, v, w = self.get_barycentric(normal * distance, point_a, point_b, point_c)
+        return Contact(normal, distance, u * a1 + v * b1 + w * c1, u * a2 + v * b2 + w * c2)
+
+    def get_barycentric(self, point, a, b, c):
+
+        ab, ac, ap = b - a, c - a, point - a
+        d00, d01, d11 = glm.dot(ab, ab), glm.dot(ab, ac), glm.dot(ac, ac)
+        d20, d21 = glm.dot(ap, ab), glm.dot(ap, ac)
+        denominator = d00 * d11 - d01 * d01
+        if abs(denominator) < 1e-12: return 1, 0, 0
+
+        v = (d11 * d20 - d01 * d21) / denominator
+        w = (d00 * d21 - d01 * d20) / denominator
+        return 1 - v - w, v, w
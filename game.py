@@ -1,10 +1,17 @@
 import sys
+import time
+import random
 import pygame as pg
 import moderngl as mgl
 from graphics_engine import GraphicsEngine
+from profiler import profiler
 
 class Game:
-    def __init__(self, win_size=(1600, 900)):
+    def __init__(self, win_size=(1600, 900), physics_hz=60, max_substeps=5, seed=None, record_path=None):
+        # Start up timing, first frame and all assets loaded, in seconds
+        self.start_time = time.perf_counter()
+        self.first_frame_time = None
+        self.loaded_time = None
         # Pygame initialization
         pg.init()
         # Window size (resizable)
@@ -22,6 +29,12 @@ class Game:
         self.clock = pg.time.Clock()
         self.time = 0
         self.delta_time = 0
+        # Physics runs at a fixed rate independent of the framerate
+        self.physics_hz = physics_hz
+        self.max_substeps = max_substeps
+        # Scenes are built from this seed, a recording saved to record_path on quit replays the run headlessly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.record_path = record_path
         # MGL Context
         self.ctx = mgl.create_context()
         # Basic Gl setup
@@ -32,12 +45,20 @@ class Game:
     def check_events(self):
         for event in pg.event.get():
             if event.type == pg.QUIT:
+                recorder = self.graphics_engine.scene.objects.recorder
+                if recorder:
+                    recorder.save(self.record_path)
+                self.graphics_engine.scene.destroy()
                 pg.quit()
                 sys.exit()
             if event.type == pg.KEYUP:
                 if event.key == pg.K_ESCAPE:  # Unlock mouse
                     pg.event.set_grab(False)
                     pg.mouse.set_visible(True)
+                if event.key == pg.K_F3:  # Toggle profiling
+                    profiler.enable(not profiler.enabled)
+                if event.key == pg.K_F4:  # Save the profiled frames for chrome://tracing
+                    profiler.export_chrome_trace('trace.json')
             if event.type == pg.MOUSEBUTTONDOWN:  # Lock mouse
                 pg.event.set_grab(True)
                 pg.mouse.set_visible(False)
@@ -45,12 +66,32 @@ class Game:
     def start(self):
         self.run = True
         while self.run:
-            pg.display.set_caption(str(round(self.clock.get_fps())))
+            draw_calls = self.graphics_engine.scene.objects.get_draw_calls()
+            triangles = self.graphics_engine.scene.objects.get_triangles()
+            caption = f'{round(self.clock.get_fps())} fps, {draw_calls} draw calls, {triangles / 1000:.0f}k triangles'
+            culling = self.graphics_engine.scene.objects.get_culling_stats()
+            caption += f', {culling["visible"]}/{culling["total"]} visible in {culling["cull_ms"]:.2f} ms'
+            asset_loader = self.graphics_engine.scene.asset_loader
+            if not asset_loader.is_done():
+                caption += f', loading {round(100 * asset_loader.get_progress())}%'
+            elif self.loaded_time is not None:
+                caption += f', first frame {self.first_frame_time * 1000:.0f} ms, loaded {self.loaded_time * 1000:.0f} ms'
+            if profiler.enabled:
+                caption += ''.join(f', {name} {value:.1f} ms' for name, value in profiler.get_percentiles().items())
+            pg.display.set_caption(caption)
             self.delta_time = self.clock.tick()
             self.check_events()  # Checks for window events
             self.graphics_engine.update()  # Render and update calls
+            self.update_load_times(asset_loader)
+
+    def update_load_times(self, asset_loader):
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - self.start_time
+        if self.loaded_time is None and asset_loader.is_done():
+            self.loaded_time = time.perf_counter() - self.start_time
 
 
 if __name__ == '__main__':
-    game = Game()
+    # python game.py [seed] [recording path]
+    game = Game(seed=int(sys.argv[1]) if len(sys.argv) > 1 else None, record_path=sys.argv[2] if len(sys.argv) > 2 else None)
     game.start()
\ No newline at end of file
@@ -1,4 +1,6 @@
 import glm    
+import numpy as np
+from profiler import profiler
 
 class GJK():
     
@@ -9,31 +11,85 @@ class GJK():
     def reset(self):
         
         self.simplex = []
+        self.separating_axis = None
+        self.iterations = 0
     
-    # accurate collision detection between two convex shapes
-    def get_gjk_collision(self, hitbox1, hitbox2):
+    # accurate collision detection between two convex shapes, start_vec warm starts from a cached axis
+    @profiler.profile('gjk', trace=False)
+    def get_gjk_collision(self, hitbox1, hitbox2, start_vec = None):
         
         self.reset()
         
         # find starting vector
-        vec = -1 * (hitbox2.get_center() - hitbox1.get_center())
-        self.simplex = [self.get_support_point(hitbox1, hitbox2, vec)]
+        vec = start_vec if start_vec is not None else self.get_start_vector(hitbox1, hitbox2)
+        support = self.get_support_point(hitbox1, hitbox2, vec)
+        self.iterations += 1
         
-        # point vector towards the origin
-        vec = -self.simplex[0][0] # may need to be changed to mult -1
+        # a cached separating axis that still separates ends the test after one support query
+        if start_vec is not None and glm.dot(support[0], start_vec) < 0:
+            self.separating_axis = start_vec
+            return False, None
+        
+        vec = self.start(support)
         for i in range(25):
             
             # gets furthest point across from origin
             a = self.get_support_point(hitbox1, hitbox2, vec)
-
-            # checks if point made it across the origin
-            if glm.dot(a[0], vec) < 0: return False, None
-            self.simplex.append(a)
+            self.iterations += 1
             
-            check, vec = self.handle_simplex()
-            if check: return True, self.simplex
+            done, result, vec = self.step(a, vec)
+            if done: return result
         
         else: return False, None
+        
+    # runs gjk on many hitbox pairs, gathering each iteration's support queries into one vectorized pass
+    def get_gjk_collision_batch(self, pairs):
+        
+        solvers = [GJK() for pair in pairs]
+        results = [(False, None)] * len(pairs)
+        batch = SupportBatch([hitbox for pair in pairs for hitbox in pair])
+        
+        active = list(range(len(pairs)))
+        vecs = [self.get_start_vector(hitbox1, hitbox2) for hitbox1, hitbox2 in pairs]
+        supports = batch.get_support_points(vecs, active)
+        vecs = [solver.start(support) for solver, support in zip(solvers, supports)]
+        
+        for i in range(25):
+            if not active: break
+            
+            supports = batch.get_support_points(vecs, active)
+            
+            still_active = []
+            for j, support in zip(active, supports):
+                done, result, vecs[j] = solvers[j].step(support, vecs[j])
+                if done: results[j] = result
+                else: still_active.append(j)
+            active = still_active
+            
+        return results
+    
+    def get_start_vector(self, hitbox1, hitbox2):
+        
+        return -1 * (hitbox2.get_center() - hitbox1.get_center())
+    
+    # seeds the simplex and returns the vector pointing towards the origin
+    def start(self, support):
+        
+        self.simplex = [support]
+        return -self.simplex[0][0] # may need to be changed to mult -1
+    
+    # adds a support point to the simplex, returns (done, result, next vector)
+    def step(self, a, vec):
+        
+        # checks if point made it across the origin
+        if glm.dot(a[0], vec) < 0:
+            self.separating_axis = vec
+            return True, (False, None), None
+        self.simplex.append(a)
+        
+        check, vec = self.handle_simplex()
+        if check: return True, (True, self.simplex), None
+        return False, None, vec
             
     def get_support_point(self, hitbox1, hitbox2, vec):
     
@@ -43,13 +99,34 @@ class GJK():
     
     def get_furthest_point(self, hitbox, vec):
     
+        if hitbox.adjacency is not None: return self.hill_climb(hitbox, vec)
+        
         # finds furthest point in given direction
-        best = (glm.vec3(0, 0, 0), -1e6)
-        for point in hitbox.get_vertices():
-            dot = glm.dot(point, vec)
-            if dot > best[1]: best = (point, dot)
+        vertices = hitbox.get_vertices()
+        return glm.vec3(*vertices[np.argmax(vertices @ np.asarray(vec, dtype='f4'))])
+    
+    # walks along hull edges from the previous support vertex until no neighbour is further along vec
+    def hill_climb(self, hitbox, vec):
+        
+        # works in local space so only the chosen vertex gets transformed
+        m_model = hitbox.obj.model.m_model
+        x, y, z = glm.transpose(glm.mat3(m_model)) * vec
+        vertices, adjacency = hitbox.vertex_list, hitbox.adjacency
+        
+        # neighbour lists are short, so plain python beats numpy call overhead here
+        index = hitbox.support_hint
+        vx, vy, vz = vertices[index]
+        best = vx * x + vy * y + vz * z
+        climbing = True
+        while climbing:
+            climbing = False
+            for neighbour in adjacency[index]:
+                vx, vy, vz = vertices[neighbour]
+                dot = vx * x + vy * y + vz * z
+                if dot > best: index, best, climbing = neighbour, dot, True
             
-        return best[0]
+        hitbox.support_hint = index
+        return m_model * glm.vec3(vertices[index])
     
     # handles operations for symplex with given range
     def handle_simplex(self):
@@ -101,4 +178,37 @@ class GJK():
     
     def triple_product(self, vec1, vec2, vec3):
     
-        return glm.cross(glm.cross(vec1, vec2), vec3)
\ No newline at end of file
+        return glm.cross(glm.cross(vec1, vec2), vec3)
+    
+class SupportBatch():
+    
+    # hitboxes are laid out as (hitbox1, hitbox2) per pair
+    def __init__(self, hitboxes):
+        
+        self.count = len(hitboxes)
+        
+        # hitboxes with equal vertex counts are stacked into one (g, n, 3) array
+        groups = {}
+        for i, hitbox in enumerate(hitboxes):
+            groups.setdefault(len(hitbox.vertices), []).append(i)
+        self.groups = [(np.array(slots), np.stack([hitboxes[i].get_vertices() for i in slots])) for slots in groups.values()]
+        
+    # support points of the minkowski difference along vecs[i] for every active pair i
+    def get_support_points(self, vecs, active):
+        
+        # finished pairs keep a zero direction so the group shapes stay fixed
+        directions = np.zeros((self.count, 3), dtype='f4')
+        active_vecs = np.array([vecs[i] for i in active], dtype='f4').reshape(-1, 3)
+        directions[0::2][active] = active_vecs
+        directions[1::2][active] = -active_vecs
+            
+        furthest = np.empty((self.count, 3), dtype='f4')
+        for slots, vertices in self.groups:
+            indices = np.argmax(np.einsum('gnk,gk->gn', vertices, directions[slots]), axis=1)
+            furthest[slots] = vertices[np.arange(len(slots)), indices]
+            
+        supports = []
+        for far1, far2 in zip(furthest[0::2][active].tolist(), furthest[1::2][active].tolist()):
+            far1, far2 = glm.vec3(far1), glm.vec3(far2)
+            supports.append((far1 - far2, (far1, far2)))
+        return supports
@@ -1,6 +1,7 @@
 import pygame as pg
 from scene import Scene
 from camera import Camera
+from profiler import profiler
 
 class GraphicsEngine:
     def __init__(self, app) -> None:
@@ -11,9 +12,19 @@ class GraphicsEngine:
         self.scene  = Scene(self)
 
     def update(self):
+        profiler.begin_frame()
         self.ctx.clear(color=(0.08, 0.16, 0.18))
 
         self.camera.update()
-        self.scene.render()
+        recorder = self.scene.objects.recorder
+        if recorder:
+            recorder.record_frame(self.app.delta_time, self.camera)
+        with profiler.scope('scene.update'):
+            self.scene.update(self.app.delta_time)
+        with profiler.scope('scene.render'):
+            self.scene.render()
 
-        pg.display.flip()
\ No newline at end of file
+        # Waits for the gpu when it is behind
+        with profiler.scope('flip'):
+            pg.display.flip()
+        profiler.end_frame()
\ No newline at end of file
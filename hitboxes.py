@@ -1,22 +1,97 @@
 import glm
+import numpy as np
+from convex_hull import ConvexHull
+from asset_registry import registry
+
+CUBE_VERTICES = [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1), (1, -1, -1), (1, 1, -1)]
+CUBE_FACES = [(0, 2, 3), (0, 1, 2), (1, 7, 2), (1, 6, 7), (6, 5, 4), (4, 7, 6), (3, 4, 5), (3, 5, 0), (3, 7, 4), (3, 2, 7), (0, 6, 1), (0, 5, 6)]
+
+class HitboxGeometry():
+    
+    # local space shape shared by every hitbox made from the same mesh, read only once loaded
+    def __init__(self, vertices, faces, dimensions, adjacency = None):
+        
+        self.vertices = np.array(vertices, dtype='f4').reshape(-1, 3)
+        self.vertices.setflags(write=False)
+        self.bounds = (self.vertices.min(axis=0), self.vertices.max(axis=0))
+        self.faces = faces
+        self.dimensions = dimensions
+        
+        # hull vertex neighbours allow hill climbing support queries from the last support vertex
+        self.adjacency = adjacency
+        self.vertex_list = self.vertices.tolist() if adjacency is not None else None
 
 class Hitbox():
     
-    def __init__(self, obj, vertices, faces, dimensions, vel = (0, 0, 0), rot_vel = (0, 0, 0)):
+    # key is the registry key of shared geometry, hitboxes built from their own geometry pass none
+    def __init__(self, obj, geometry, vel = (0, 0, 0), rot_vel = (0, 0, 0), key = None):
         
         # model
         self.obj = obj
         
-        # for collision
-        self.vertices = [glm.vec3(*vertex) for vertex in vertices]
-        self.faces = faces
-        self.dimensions = dimensions
+        # for collision, only the transform and caches below are per instance
+        self.geometry = geometry
+        self.key = key
+        self.dimensions = geometry.dimensions
         self.scale_dimensions()
+        self.support_hint = 0
         
-        # movement
+        # world space cache, cleared whenever the model matrix changes
+        self.world_vertices = None
+        self.face_normals = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # movement, stored on the object
         self.vel = glm.vec3(*vel)
         self.rot_vel = glm.vec3(*rot_vel)
         
+    @property
+    def vertices(self):
+        
+        return self.geometry.vertices
+    
+    @property
+    def faces(self):
+        
+        return self.geometry.faces
+    
+    @property
+    def adjacency(self):
+        
+        return self.geometry.adjacency
+    
+    @property
+    def vertex_list(self):
+        
+        return self.geometry.vertex_list
+    
+    # hands the shared geometry back to the registry
+    def release(self):
+        
+        if self.key is not None: registry.release('hitbox', self.key)
+        self.key = None
+        
+    @property
+    def vel(self):
+        
+        return self.obj.vel
+    
+    @vel.setter
+    def vel(self, vel):
+        
+        self.obj.vel = vel
+        
+    @property
+    def rot_vel(self):
+        
+        return self.obj.rot_vel
+    
+    @rot_vel.setter
+    def rot_vel(self, rot_vel):
+        
+        self.obj.rot_vel = rot_vel
+        
     def scale_dimensions(self):
         
         self.dimensions = self.obj.scale * self.dimensions
@@ -27,7 +102,32 @@ class Hitbox():
     
     def get_vertices(self):
         
-        return [self.obj.model.m_model * vertex for vertex in self.vertices]
+        if self.world_vertices is None:
+            self.cache_misses += 1
+            self.world_vertices = self.transform_vertices(self.vertices)
+        else: self.cache_hits += 1
+        return self.world_vertices
+    
+    # applies the model matrix to an (n, 3) float32 array of local points
+    def transform_vertices(self, vertices):
+        
+        m_model = self.obj.model.get_model_array() # column major
+        return vertices @ m_model[:3, :3] + m_model[3, :3]
+    
+    def set_dirty(self):
+        
+        self.world_vertices = None
+        self.face_normals = {}
+        
+    def get_cache_stats(self):
+        
+        return {'hits' : self.cache_hits, 'misses' : self.cache_misses}
+    
+    # world space axis aligned bounding box as (mins, maxs)
+    def get_aabb(self):
+        
+        vertices = self.get_vertices()
+        return glm.vec3(*vertices.min(axis=0)), glm.vec3(*vertices.max(axis=0))
     
     def move_tick(self, delta_time, acceleration : glm.vec3, rot_acceleration : glm.vec3):
         
@@ -48,20 +148,23 @@ class Hitbox():
     # gets corresponding vertex with face and face-vertex index
     def get_face_vertex(self, fi, vi):
         
-        return self.get_vertices()[self.faces[fi][vi]]
+        return glm.vec3(*self.get_vertices()[self.faces[fi][vi]])
         
     # gets outward facing normal vector of the face
     def get_face_normal(self, index):
         
+        if index in self.face_normals: return self.face_normals[index]
         norm = glm.cross(self.get_face_vertex(index, 1) - self.get_face_vertex(index, 0), self.get_face_vertex(index, -1) - self.get_face_vertex(index, 0))
+        self.face_normals[index] = norm
         return norm
     
     # determines if a face contains a given point
     def face_contains_point(self, index, point):
         
+        vertices = self.get_vertices()
         for vertex_index in self.faces[index]: # pulls vertex index in vertex array
             for i in range(3):
-                if round(self.get_vertices()[vertex_index][i], 2) != round(point[i], 2): break
+                if round(vertices[vertex_index][i], 2) != round(point[i], 2): break
                 
             # if face-vertex is equal to vertex
             else: return True
@@ -79,57 +182,47 @@ class CubeHitbox(Hitbox):
     
     def __init__(self, obj, vel = (0, 0, 0), rot_vel = (0, 0, 0)):
         
-        super().__init__(obj,
-            [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1), (1, -1, -1), (1, 1, -1)],
-            [(0, 2, 3), (0, 1, 2), (1, 7, 2), (1, 6, 7), (6, 5, 4), (4, 7, 6), (3, 4, 5), (3, 5, 0), (3, 7, 4), (3, 2, 7), (0, 6, 1), (0, 5, 6)],
-            (2, 2, 2), vel, rot_vel)
+        super().__init__(obj, registry.acquire('hitbox', 'cube'), vel, rot_vel, 'cube')
         
 class FittedHitbox(Hitbox):
     
-    def __init__(self, obj, file_name : str, rectangular = False, vel = (0, 0, 0), rot_vel = (0, 0, 0)):
+    def __init__(self, obj, file_name : str, rectangular = False, vel = (0, 0, 0), rot_vel = (0, 0, 0), hull = True, max_hull_vertices = None):
         
-        vertices, faces, mins, maxs = self.read_in_file(file_name)
+        key = (file_name, rectangular, hull, max_hull_vertices)
+        super().__init__(obj, registry.acquire('hitbox', key), vel, rot_vel, key)
+        
+    @staticmethod
+    def load_geometry(file_name, rectangular, hull, max_hull_vertices):
+        
+        path = f'objects/{file_name}.obj'
+        mesh = registry.acquire('mesh', path)
+        mins, maxs = mesh.get_bounds()
         dimensions = [maxs[i] - mins[i] for i in range(3)]
 
-        # super init for both rect and fitted
+        # geometry for both rect and fitted
         if rectangular:
-            super().__init__(obj,
-                [(x, y, z) for z in (mins[2], maxs[2]) for y in (mins[1], maxs[1]) for x in (mins[0], maxs[0])], 
-                [(0, 2, 3), (0, 1, 2), (1, 7, 2), (1, 6, 7), (6, 5, 4), (4, 7, 6), (3, 4, 5), (3, 5, 0), (3, 7, 4), (3, 2, 7), (0, 6, 1), (0, 5, 6)],
-                dimensions, vel, rot_vel)
+            geometry = HitboxGeometry([(x, y, z) for z in (mins[2], maxs[2]) for y in (mins[1], maxs[1]) for x in (mins[0], maxs[0])], CUBE_FACES, dimensions)
+        elif hull:
+            # gjk assumes convex shapes, so concave and interior vertices are dropped, the full hull is compiled with the mesh
+            if max_hull_vertices: hull_vertices, hull_faces, adjacency = FittedHitbox.get_hull(mesh.get_positions(), max_hull_vertices)
+            else: hull_vertices, hull_faces, adjacency = mesh.get_hull()
+            geometry = HitboxGeometry(hull_vertices, hull_faces, dimensions, adjacency)
         else:
-            super().__init__(obj, vertices, faces, dimensions, vel, rot_vel)
+            geometry = HitboxGeometry(mesh.get_positions(), mesh.get_faces(), dimensions)
             
-    def read_in_file(self, file_name):
-        
-        # load in file
-        lines = []
-
-        with open(f'objects/{file_name}.obj') as obj_file:
-            lines = obj_file.readlines()
+        # geometry holds its own copies, so the mapped mesh can be dropped
+        registry.release('mesh', path)
+        return geometry
             
-        # gets vertices and faces
-        vertices = []
-        faces = []
-        
-        # dimensions
-        mins, maxs = [1e6, 1e6, 1e6], [-1e6, -1e6, -1e6]
+    @staticmethod
+    def get_hull(vertices, max_vertices):
         
-        # fill list of vertices and faces
-        for line in lines:
-            head = line[0:2]
-            if head == 'v ':
-                
-                # adds vertex to list of vertices
-                coords = [float(i) for i in line[2:].split()]
-                vertices.append(glm.vec3(*coords))
-                
-                # determines dimensions of model
-                for i in range(3):
-                    mins[i] = min(coords[i], mins[i])
-                    maxs[i] = max(coords[i], maxs[i])
-                
-            elif head == 'f ':
-                faces.append([int(i.split('/')[0]) - 1 for i in line[2:].split()]) # gets vertex indices
-                
-        return vertices, faces, mins, maxs
\ No newline at end of file
+        convex_hull = ConvexHull(vertices, max_vertices)
+        return convex_hull.vertices, convex_hull.faces, convex_hull.adjacency
+
+def load_hitbox_geometry(key):
+    
+    if key == 'cube': return HitboxGeometry(CUBE_VERTICES, CUBE_FACES, (2, 2, 2))
+    return FittedHitbox.load_geometry(*key)
+
+registry.register_loader('hitbox', load_hitbox_geometry)
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class InstanceHandler:
+    def __init__(self, scene):
+        self.scene = scene
+        self.ctx = scene.ctx
+        self.vao_handler = scene.vao_handler
+        self.programs = self.vao_handler.program_handler.programs
+        self.camera = scene.graphics_engine.camera
+
+        self.groups = {}
+        self.draw_calls = 0
+        self.triangles = 0
+        self.vao_handler.vbo_handler.on_ready.append(self.on_vbo_ready)
+
+    # Objects sharing a vao and material are drawn with one instanced call
+    def build_groups(self, objects):
+        for group in self.groups.values():
+            group.release()
+        self.groups = {}
+        for obj in objects:
+            key = (obj.model.vao_name, obj.material)
+            if key not in self.groups:
+                self.groups[key] = InstanceGroup(self, *key)
+            self.groups[key].objects.append(obj)
+
+    # Groups drawing a placeholder switch to the mesh once it is uploaded
+    def on_vbo_ready(self, vao_name):
+        for (name, material), group in self.groups.items():
+            if name == vao_name:
+                group.build_vaos(self)
+
+    # Visible is a mask over rigid body world indices, pixels per unit selects each instance's level of detail
+    def update(self, world, visible, pixels_per_unit):
+        for group in self.groups.values():
+            group.update(world, visible, pixels_per_unit)
+
+    def update_shadows(self, world, visible, pixels_per_unit):
+        for group in self.groups.values():
+            group.update_shadow(world, visible, pixels_per_unit)
+
+    def render(self):
+        program = self.programs['default_instanced']
+        for group in self.groups.values():
+            if not sum(group.counts):
+                continue
+            group.material.write(program)
+            self.add_stats(*group.render(group.vaos, group.counts))
+
+    def render_shadows(self):
+        for group in self.groups.values():
+            self.add_stats(*group.render(group.shadow_vaos, group.shadow_counts))
+
+    def add_stats(self, draw_calls, triangles):
+        self.draw_calls += draw_calls
+        self.triangles += triangles
+
+    def destroy(self):
+        [group.release() for group in self.groups.values()]
+
+
+class InstanceGroup:
+    def __init__(self, instance_handler, vao_name, material):
+        self.vao_name = vao_name
+        self.material = material
+        self.objects = []
+
+        # One column major mat4 per visible instance and level of detail, the shadow pass culls against the light.
+        # GL 3.3 has no base instance, so every level streams from its own buffer
+        self.ctx = instance_handler.ctx
+        self.vbo = None
+        self.buffers, self.shadow_buffers = [], []
+        self.vaos, self.shadow_vaos = [], []
+        self.counts, self.shadow_counts = [], []
+        self.indices = None
+        self.build_vaos(instance_handler)
+
+    def build_vaos(self, instance_handler):
+        self.release_vaos()
+        self.vbo = instance_handler.vao_handler.vbo_handler.vbos[self.vao_name]
+        levels = len(self.vbo.lods)
+        while len(self.buffers) < levels:
+            self.buffers.append(self.ctx.buffer(reserve=64, dynamic=True))
+            self.shadow_buffers.append(self.ctx.buffer(reserve=64, dynamic=True))
+        programs = instance_handler.programs
+        get_instanced_vao = instance_handler.vao_handler.get_instanced_vao
+        self.vaos = [get_instanced_vao(programs['default_instanced'], self.vbo, buffer) for buffer in self.buffers[:levels]]
+        self.shadow_vaos = [get_instanced_vao(programs['shadow_map_instanced'], self.vbo, buffer) for buffer in self.shadow_buffers[:levels]]
+        self.counts, self.shadow_counts = [0] * levels, [0] * levels
+
+    # Streams the render matrices of the visible instances into their level's buffer, returns how many each got
+    def write(self, buffers, world, visible, pixels_per_unit):
+        if self.indices is None or len(self.indices) != len(self.objects):
+            self.indices = np.array([obj.index for obj in self.objects], dtype=int)
+        indices = self.indices[visible[self.indices]]
+        levels = self.vbo.get_lod(pixels_per_unit[indices])
+        counts = []
+        for level in range(len(self.vbo.lods)):
+            data = world.render_matrix[indices[levels == level]]
+            buffer = buffers[level]
+            if data.nbytes > buffer.size:
+                buffer.orphan(data.nbytes)
+            if len(data):
+                buffer.write(data)
+            counts.append(len(data))
+        return counts
+
+    def update(self, world, visible, pixels_per_unit):
+        self.counts = self.write(self.buffers, world, visible, pixels_per_unit)
+
+    def update_shadow(self, world, visible, pixels_per_unit):
+        self.shadow_counts = self.write(self.shadow_buffers, world, visible, pixels_per_unit)
+
+    # Returns the draw calls and triangles
+    def render(self, vaos, counts):
+        draw_calls = triangles = 0
+        for vao, count, (first, vertices) in zip(vaos, counts, self.vbo.lods):
+            if not count:
+                continue
+            vao.render(vertices=vertices, first=first, instances=count)
+            draw_calls += 1
+            triangles += count * vertices // 3
+        return draw_calls, triangles
+
+    def release_vaos(self):
+        [vao.release() for vao in self.vaos + self.shadow_vaos]
+
+    def release(self):
+        self.release_vaos()
+        [buffer.release() for buffer in self.buffers + self.shadow_buffers]
@@ -1,4 +1,5 @@
 import glm
+import numpy as np
 
 
 class LightHandler:
@@ -6,6 +7,14 @@ class LightHandler:
         self.dir_light = DirectionalLight(color=(1.0, 1.0, 1.0))
         self.point_lights = [PointLight(pos=(1, 1, 1), color=(3.0, 0.0, 0.0), diffuse=3), PointLight(pos=(-10, 1, 1), color=(0.0, 3.0, 0.0)), PointLight(pos=(10, 1, 15), color=(0.0, 0.0, 3.0))]
 
+    # (n, 12) float32 rows of (pos, constant), (color, linear), (quadratic, ambient, diffuse, specular)
+    def get_point_light_data(self):
+        data = np.zeros((len(self.point_lights), 12), dtype='f4')
+        for i, light in enumerate(self.point_lights):
+            data[i] = (*light.pos, light.constant.value, *light.color, light.linear.value,
+                       light.quadratic.value, light.a.value, light.d.value, light.s.value)
+        return data
+
     def write(self, program, dir=True, point=True):
         if dir:
             program['dir_light.direction'].write(self.dir_light.dir)
@@ -38,6 +47,12 @@ class DirectionalLight(Light):
     def __init__(self, direction=(1.0, -1.0, 1.0), ambient=0.2, diffuse=0.8, specular=1.0, color=(1.0, 1.0, 1.0)):
         super().__init__(ambient, diffuse, specular, color)
         self.dir = glm.vec3(direction)
+        # Shadow pass view, looking along the light direction at the origin
+        self.m_view_light = self.get_view_matrix()
+
+    def get_view_matrix(self, center=(0, 0, 0), distance=50):
+        center = glm.vec3(center)
+        return glm.lookAt(center - glm.normalize(self.dir) * distance, center, glm.vec3(0, 1, 0))
 
 
 class PointLight(Light):
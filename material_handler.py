@@ -1,4 +1,5 @@
 import glm
+from profiler import profiler
 
 
 class MaterialHandler:
@@ -14,11 +15,21 @@ class MaterialHandler:
 
 class BaseMaterial:
     def __init__(self, diffuse: str, specular: str, specular_constant: str, textures):
-        self.d = textures[diffuse]
-        self.s = textures[specular]
+        # Looked up on use so textures loaded in the background replace their placeholder
+        self.textures = textures
+        self.diffuse = diffuse
+        self.specular = specular
 
         self.spec_const = glm.float32(specular_constant)
 
+    @property
+    def d(self):
+        return self.textures[self.diffuse]
+
+    @property
+    def s(self):
+        return self.textures[self.specular]
+
     def write(self, program):
         program['material.d'] = 1
         self.d.use(location=1)
@@ -26,3 +37,4 @@ class BaseMaterial:
         self.s.use(location=2)
 
         program['material.spec_const'].write(self.spec_const)
+        profiler.count('uniform_writes', 3)
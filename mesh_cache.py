@@ -0,0 +1,249 @@
+import os
+import struct
+import hashlib
+import numpy as np
+from convex_hull import ConvexHull
+
+# compiled mesh file, a header and block table followed by aligned raw arrays
+MAGIC = b'RMSH'
+VERSION = 2
+ALIGNMENT = 64
+HEADER = struct.Struct('<4sI32sQQI') # magic, version, source hash, source size, source mtime, block count
+BLOCK = struct.Struct('<24s4sQQQ') # name, dtype, rows, columns (0 for flat arrays), offset
+
+# grid cells along the largest extent of the mesh for each simplified level
+LOD_RESOLUTIONS = (128, 64, 32, 16)
+# levels that keep more than this share of the previous level's triangles are dropped
+LOD_MIN_REDUCTION = 0.7
+
+# merges identical vertex rows, returns the unique rows in first use order and 16 or 32 bit indices into them
+def weld(vertex_data, index_dtype = None):
+
+    vertex_data = np.ascontiguousarray(vertex_data, dtype='f4')
+    rows = vertex_data.view(np.dtype((np.void, vertex_data.itemsize * vertex_data.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    # first use order keeps neighbouring triangles close together in the post transform cache
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    indices = remap[inverse.ravel()]
+    if index_dtype is None: index_dtype = 'u2' if len(order) < 2 ** 16 else 'u4'
+    return vertex_data[first[order]], indices.astype(index_dtype)
+
+# quadric error vertex clustering, every grid cell collapses to its vertex of least error under the planes of the triangles
+# touching the cell, returns triangle indices into the original vertices so every level shares one vertex buffer
+def simplify(positions, indices, cell_size):
+
+    positions = np.asarray(positions, dtype='f8')
+    triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    cells = np.floor((positions - positions.min(axis=0)) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    _, clusters = np.unique((cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2], return_inverse=True)
+    clusters = clusters.ravel()
+
+    # area weighted plane quadrics as the 10 upper triangle terms of the 4x4 matrix
+    a, b, c = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    normals = np.cross(b - a, c - a)
+    areas = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(areas, 1e-20)[:, None]
+    planes = np.concatenate([normals, -(normals * a).sum(axis=1)[:, None]], axis=1)
+    rows, columns = np.triu_indices(4)
+    quadrics = areas[:, None] * planes[:, rows] * planes[:, columns]
+
+    # every corner adds its triangle's quadric to its cluster
+    corners = clusters[triangles].ravel()
+    cluster_quadrics = np.stack([np.bincount(corners, np.repeat(quadrics[:, i], 3), clusters.max() + 1) for i in range(10)], axis=1)
+
+    # error of each vertex under its cluster's quadric, off diagonal terms appear twice in v^T Q v
+    points = np.concatenate([positions, np.ones((len(positions), 1))], axis=1)
+    errors = (cluster_quadrics[clusters] * points[:, rows] * points[:, columns] * np.where(rows == columns, 1, 2)).sum(axis=1)
+    order = np.lexsort((errors, clusters))
+    representatives = order[np.r_[True, clusters[order][1:] != clusters[order][:-1]]]
+
+    # triangles collapsed to a line or point vanish, as do copies of the same triangle
+    remapped = representatives[clusters[triangles]]
+    remapped = remapped[(remapped[:, 0] != remapped[:, 1]) & (remapped[:, 1] != remapped[:, 2]) & (remapped[:, 2] != remapped[:, 0])]
+    _, first = np.unique(np.sort(remapped, axis=1), axis=0, return_index=True)
+    return remapped[np.sort(first)].ravel().astype('u4')
+
+# simplified levels as (offsets, flat indices, errors), the error of a level is the diagonal of its grid cells in mesh units
+def build_lods(positions, indices):
+
+    extent = float((positions.max(axis=0) - positions.min(axis=0)).max())
+    levels, errors, triangles = [], [], len(indices)
+    for resolution in LOD_RESOLUTIONS:
+        cell_size = extent / resolution
+        level = simplify(positions, indices, cell_size)
+        if not len(level) or len(level) > LOD_MIN_REDUCTION * triangles: continue
+        levels.append(level)
+        errors.append(cell_size * np.sqrt(3))
+        triangles = len(level)
+
+    offsets = np.zeros(len(levels) + 1, dtype='u4')
+    offsets[1:] = np.cumsum([len(level) for level in levels])
+    flat = np.concatenate(levels) if levels else np.zeros(0, dtype='u4')
+    return offsets, flat, np.array(errors, dtype='f4')
+
+# variable length lists as (offsets, flat values)
+def pack_lists(lists):
+
+    offsets = np.zeros(len(lists) + 1, dtype='u4')
+    offsets[1:] = np.cumsum([len(values) for values in lists])
+    return offsets, np.array([value for values in lists for value in values], dtype='u4')
+
+def unpack_lists(offsets, values):
+
+    offsets, values = offsets.tolist(), values.tolist()
+    return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+class Mesh():
+
+    def __init__(self, path, source_hash, blocks):
+
+        self.path = path
+        self.source_hash = source_hash
+
+        # read only views into the memory mapped file
+        self.blocks = blocks
+
+    # interleaved T2F_N3F_V3F vertices and uint32 indices for the vbo
+    def get_render_data(self):
+
+        return self.blocks['vertices'], self.blocks['indices']
+
+    # simplified levels of detail as (indices into the render vertices, error in mesh units), coarsest last
+    def get_lods(self):
+
+        offsets, indices = self.blocks['lod_offsets'].tolist(), self.blocks['lod_indices']
+        return [(indices[offsets[i]:offsets[i + 1]], error) for i, error in enumerate(self.blocks['lod_errors'].tolist())]
+
+    # obj vertex positions and polygon faces for hitboxes
+    def get_positions(self):
+
+        return self.blocks['positions']
+
+    def get_faces(self):
+
+        return unpack_lists(self.blocks['face_offsets'], self.blocks['face_indices'])
+
+    def get_bounds(self):
+
+        positions = self.blocks['positions']
+        return positions.min(axis=0).tolist(), positions.max(axis=0).tolist()
+
+    # convex hull as (vertices, faces, adjacency)
+    def get_hull(self):
+
+        faces = [tuple(face) for face in self.blocks['hull_faces'].tolist()]
+        return self.blocks['hull_vertices'], faces, unpack_lists(self.blocks['adjacency_offsets'], self.blocks['adjacency_indices'])
+
+def get_cache_path(source):
+
+    return source + '.mesh'
+
+def get_source_stat(source):
+
+    stat = os.stat(source)
+    return stat.st_size, stat.st_mtime_ns
+
+def hash_file(path):
+
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''): digest.update(chunk)
+    return digest.digest()
+
+# opens the cached mesh for an obj file, compiling it first if it is missing or the source changed
+def load_mesh(source):
+
+    cache_path = get_cache_path(source)
+    has_source = os.path.exists(source)
+    if os.path.exists(cache_path):
+
+        # caches written by another version, or cut short, are stale whether or not the source is there
+        try: mesh, size, mtime = read_mesh(cache_path)
+        except (ValueError, struct.error): mesh = None
+
+        # a shipped cache without its source is trusted as is
+        if mesh and (not has_source or (size, mtime) == get_source_stat(source)): return mesh
+
+        # touched but unchanged sources only cost a hash
+        if mesh and mesh.source_hash == hash_file(source): return mesh
+
+    build_mesh(source, cache_path)
+    return read_mesh(cache_path)[0]
+
+def read_mesh(cache_path):
+
+    data = np.memmap(cache_path, dtype='u1', mode='r')
+    magic, version, source_hash, size, mtime, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION: raise ValueError(f'{cache_path} is not a version {VERSION} mesh cache')
+
+    blocks = {}
+    for i in range(count):
+        name, dtype, rows, columns, offset = BLOCK.unpack_from(data, HEADER.size + i * BLOCK.size)
+        dtype = np.dtype(dtype.rstrip(b'\0').decode())
+        length = rows * max(columns, 1) * dtype.itemsize
+        block = data[offset:offset + length].view(dtype)
+        blocks[name.rstrip(b'\0').decode()] = block.reshape(rows, columns) if columns else block
+    return Mesh(cache_path, source_hash, blocks), size, mtime
+
+def build_mesh(source, cache_path):
+
+    render_data = read_render_data(source)
+    vertices, indices = weld(render_data, 'u4')
+
+    # pywavefront can load from its own cache without the obj, positions and triangles then come from the render data
+    if os.path.exists(source): positions, faces = read_obj(source)
+    else:
+        positions, faces = np.unique(render_data[:, 5:], axis=0, return_inverse=True)
+        faces = faces.reshape(-1, 3).tolist()
+    hull = ConvexHull(positions)
+
+    blocks = {'vertices' : vertices, 'indices' : indices, 'positions' : positions}
+    blocks['lod_offsets'], blocks['lod_indices'], blocks['lod_errors'] = build_lods(vertices[:, 5:], indices)
+    blocks['face_offsets'], blocks['face_indices'] = pack_lists(faces)
+    blocks['hull_vertices'] = hull.vertices
+    blocks['hull_faces'] = np.array(hull.faces, dtype='u4').reshape(-1, 3)
+    blocks['adjacency_offsets'], blocks['adjacency_indices'] = pack_lists(hull.adjacency)
+    if os.path.exists(source): write_mesh(cache_path, hash_file(source), get_source_stat(source), blocks)
+    else: write_mesh(cache_path, bytes(32), (0, 0), blocks)
+
+def write_mesh(cache_path, source_hash, source_stat, blocks):
+
+    # lays every block out on an aligned offset after the block table
+    table, offset = [], HEADER.size + BLOCK.size * len(blocks)
+    for name, array in blocks.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        columns = array.shape[1] if array.ndim == 2 else 0
+        table.append(BLOCK.pack(name.encode(), array.dtype.str.lstrip('<|').encode(), len(array), columns, offset))
+        offset += array.nbytes
+
+    # written next to the target then swapped in, so readers never see a partial file
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, source_hash, *source_stat, len(blocks)))
+        for entry in table: file.write(entry)
+        for entry, array in zip(table, blocks.values()):
+            file.write(b'\0' * (BLOCK.unpack(entry)[4] - file.tell()))
+            file.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, cache_path)
+
+def read_render_data(source):
+
+    # only needed when compiling, so loading a cached mesh does not require pywavefront
+    import pywavefront
+    objs = pywavefront.Wavefront(source, cache=True, parse=True)
+    obj = objs.materials.popitem()[1]
+    return np.array(obj.vertices, dtype='f4').reshape(-1, 8)
+
+# vertex positions and faces as written in the obj, faces keep their polygon size
+def read_obj(source):
+
+    with open(source) as obj_file:
+        lines = obj_file.read().splitlines()
+
+    vertices = [line[2:].split()[:3] for line in lines if line[0:2] == 'v ']
+    faces = [[int(i.split('/')[0]) - 1 for i in line[2:].split()] for line in lines if line[0:2] == 'f ']
+    return np.array(vertices, dtype='f4').reshape(-1, 3), faces
@@ -1,65 +1,59 @@
 import glm
 from material_handler import *
+from body import BodyModel
+from profiler import profiler
 
 
-class BaseModel:
+# Physics pose and hitbox updates come from BodyModel
+class BaseModel(BodyModel):
     def __init__(self, object, scene, vao) -> None:
-        self.object = object
+        super().__init__(object)
         self.scene = scene
         self.vao_name = vao
-        self.vao = self.scene.vao_handler.vaos[vao]
         self.program = self.vao.program
         self.camera = scene.graphics_engine.camera
-        self.m_model = self.get_model_matrix()
 
         self.on_init()
 
+    # Looked up on use so meshes loaded in the background replace their placeholder
+    @property
+    def vao(self):
+        return self.scene.vao_handler.vaos[self.vao_name]
+
+    @property
+    def vbo(self):
+        return self.scene.vao_handler.vbo_handler.vbos[self.vao_name]
+
+    @property
+    def shadow_vao(self):
+        return self.scene.vao_handler.vaos[f'shadow_{self.vao_name}']
+
     def on_init(self):
         # Shadow
-        self.shadow_vao = self.scene.vao_handler.vaos[f'shadow_{self.vao_name}']
         self.shadow_program = self.shadow_vao.program
-        self.shadow_program['m_proj'].write(self.camera.m_proj)
         self.shadow_program['m_model'].write(self.m_model)
-        # MVP
-        self.program['m_proj'].write(self.camera.m_proj)
-        self.program['m_view'].write(self.camera.m_view)
+        # Projection and view come from the camera uniform buffer
         self.program['m_model'].write(self.m_model)
 
-    def update(self):
-        self.m_model = self.get_model_matrix()
-        self.program['m_model'].write(self.m_model)
+    # (first index, index count) of the level of detail for the object's size on screen
+    def get_lod_range(self):
+        vbo = self.vbo
+        return vbo.lods[vbo.get_lod(self.scene.objects.pixels_per_unit[self.object.index])]
 
+    # Returns the number of triangles drawn
     def render(self):
-        self.update()
-        self.vao.render()
+        self.program['m_model'].write(self.object.world.render_matrix[self.object.index])
+        profiler.count('uniform_writes')
+        first, count = self.get_lod_range()
+        self.vao.render(vertices=count, first=first)
+        return count // 3
 
     def update_shadow(self):
-        self.shadow_program['m_model'].write(self.m_model)
+        self.shadow_program['m_model'].write(self.object.world.render_matrix[self.object.index])
+        profiler.count('uniform_writes')
 
     def render_shadow(self):
         self.update_shadow()
-        self.shadow_vao.render()
-
-    def get_model_matrix(self):
-        m_model = glm.mat4()
-        # Translate
-        m_model = glm.translate(m_model, self.object.pos)
-        # Rotate
-        m_model = glm.rotate(m_model, self.object.rot.x, glm.vec3(1, 0, 0))
-        m_model = glm.rotate(m_model, self.object.rot.y, glm.vec3(0, 1, 0))
-        m_model = glm.rotate(m_model, self.object.rot.z, glm.vec3(0, 0, 1))
-        # Scael
-        m_model = glm.scale(m_model, self.object.scale)
-        return m_model
-    
-
-class SkyBoxModel(BaseModel):
-    def __init__(self, object, scene, vao):
-        super().__init__(object, scene, vao)
-
-    def on_init(self):
-        # MVP
-        self.program['m_proj'].write(self.camera.m_proj)
-        self.program['m_view'].write(self.camera.m_view)
-    
-    def update(self): ...
\ No newline at end of file
+        first, count = self.get_lod_range()
+        self.shadow_vao.render(vertices=count, first=first)
+        return count // 3
\ No newline at end of file
@@ -1,109 +1,151 @@
 import model
-import mesh
-import glm
+import numpy as np
 from material_handler import MaterialHandler
-from hitboxes import *
-from physics_engine import PhysicsEngine
-from random import randint
+from body import Body
+from physics_world import PhysicsWorld, build_box_rain
+from recorder import Recorder
+from instance_handler import InstanceHandler
+from culling import BVH, Frustum
+from profiler import profiler
 
 class ObjectHandler:
     def __init__(self, scene):
         self.scene = scene
         self.ctx = scene.ctx
-        self.objects = {'container' : [], 'metal_box' : [], 'cat' : [], 'meshes' : [], 'skybox' : []}
+        self.objects = {'container' : [], 'metal_box' : [], 'cat' : [], 'meshes' : []}
 
         self.light_handler = self.scene.light_handler
 
         self.material_handler = MaterialHandler(self.scene.texture_handler.textures)
         
-        # Physics
-        self.pe = PhysicsEngine(-9.8)
+        # Physics, every random choice in the scene comes from the seeded physics rng
+        app = self.scene.graphics_engine.app
+        self.physics = PhysicsWorld(-9.8, seed=app.seed)
+        self.pe = self.physics.pe
+        self.world = self.physics.world
+
+        # Instanced rendering for categories drawn with the default program
+        self.instancing = True
+        self.instanced_types = ('container', 'metal_box', 'cat')
+        self.instance_handler = InstanceHandler(self.scene)
+        self.draw_calls = 0
+        self.triangles = 0
+
+        # Frustum culling over world bounds, refit every frame
+        self.bvh = BVH()
+        self.visible = self.shadow_visible = np.zeros(0, dtype=bool)
+        self.cull_time = 0
+        # Screen pixels covered by one mesh unit of each body, selects mesh levels of detail
+        self.pixels_per_unit = np.zeros(0, dtype='f4')
 
         self.on_init()
+        self.instance_handler.build_groups([obj for obj_type in self.instanced_types for obj in self.objects[obj_type]])
+
+        # Seed, step times, camera input and body snapshots for a headless replay
+        self.recorder = Recorder(self.physics, 'box_rain') if app.record_path else None
 
     def on_init(self):
 
-        self.objects['skybox'].append(Object(self, self.scene, model.SkyBoxModel, vao='skybox', immovable = True, gravity = False))
-        for i in range(20):
-            self.objects['metal_box'].append(Object(self, self.scene, model.BaseModel, pos=(randint(-20, 20), randint(-30, 0), randint(-20, 20)), scale=(5, 0.5, 5), rot = (randint(-180, 180), randint(-180, 180), randint(-180, 180)),material='metal_box', immovable = True, gravity = False))
-        for i in range(20):
-            self.objects['metal_box'].append(Object(self, self.scene, model.BaseModel, pos=(randint(-20, 20), randint(10, 20), randint(-20, 20)), scale=(0.5, 0.5, 0.5), material='metal_box'))
+        build_box_rain(self.physics, self.add_object)
         #self.objects['metal_box'].append(Object(self, self.scene, model.BaseModel, pos=(-10, 1, 1), scale=(.25, .25, .25), material='metal_box', immovable = True, gravity = False))
         #self.objects['metal_box'].append(Object(self, self.scene, model.BaseModel, pos=(10, 1, 15), scale=(.25, .25, .25), material='metal_box', immovable = True, gravity = False))
 
         #self.objects['meshes'].append(Object(self, self.scene, model.BaseModel, vao='terrain', pos=(0, 0, 0), scale=(1, 1, 1), rot=(0, 0, 0), material='metal_box', immovable = True, gravity = False))
 
-    def update(self, delta_time):
-    
-        movable_objects = []
-        for category in self.objects:
-            if category == 'skybox': continue
-            category_list = self.objects[category]
-            for obj in category_list: 
-                
-                movable_objects.append(obj)   
-                if obj.immovable: continue    
-                
-                # changes pos of all models in scene based off hitbox vel
-                obj.move_tick(delta_time)
-                
-                if obj.pos[1] < -30: 
-                    obj.set_pos(glm.vec3(randint(-20, 20), randint(10, 20), randint(-20, 20)))
-                    #obj.set_pos(glm.vec3(0, 10, 0))
-                    obj.hitbox.set_vel(glm.vec3(0, 0, 0))
-                    
-                obj.hitbox.move_tick(delta_time, glm.vec3(0, self.pe.gravity_strength, 0), glm.vec3(0, 0, 0))
-                    
-        self.pe.resolve_collisions(movable_objects, delta_time)
+    # Rendered object for a body of a physics scene, the kind names its category and material
+    def add_object(self, kind, **kwargs):
+        obj = Object(self, self.scene, model.BaseModel, material=kind, **kwargs)
+        self.objects[kind].append(obj)
+        self.physics.bodies.append(obj)
+        return obj
 
+    @profiler.profile('objects.update')
+    def update(self, delta_time):
+        self.physics.step(delta_time)
+
+    # Called once per frame before the render passes
+    def update_render(self, alpha):
+        self.world.update_render_matrices(alpha)
+        n = self.world.count
+        self.bvh.update(self.world.render_matrix[:n], self.world.bound_min[:n], self.world.bound_max[:n])
+        camera = self.scene.graphics_engine.camera
+        self.visible = self.bvh.cull(Frustum(camera.m_proj * camera.m_view))
+        self.cull_time = self.bvh.cull_time
+        self.pixels_per_unit = self.get_pixels_per_unit(self.world.render_matrix[:n], camera)
+        if self.instancing:
+            self.instance_handler.update(self.world, self.visible, self.pixels_per_unit)
+        self.draw_calls = self.instance_handler.draw_calls = 0
+        self.triangles = self.instance_handler.triangles = 0
+
+    # Largest axis scale of each matrix projected at its distance from the camera
+    def get_pixels_per_unit(self, matrices, camera):
+        scales = np.linalg.norm(matrices[:, :3, :3], axis=2).max(axis=1)
+        distances = np.linalg.norm(matrices[:, 3, :3] - np.array(camera.position), axis=1)
+        return camera.get_projected_size(scales, distances)
+
+    # Hands hitbox geometry back to the registry and stops the physics world
+    def destroy(self):
+        for obj in [obj for objects in self.objects.values() for obj in objects]:
+            obj.release()
+        self.physics.close()
+        self.instance_handler.destroy()
+
+    def get_culling_stats(self):
+        return {'visible': int(self.visible.sum()), 'total': len(self.visible), 'cull_ms': self.cull_time * 1000}
+
+    def get_draw_calls(self):
+        return self.draw_calls + self.instance_handler.draw_calls
+
+    def get_triangles(self):
+        return self.triangles + self.instance_handler.triangles
+
+    def is_instanced(self, obj_type):
+        return self.instancing and obj_type in self.instanced_types
+
+    # The light matrix comes from the camera uniform buffer, only the shadow map is bound
     def apply_shadow_shader_uniforms(self):
-        programs = self.scene.vao_handler.program_handler.programs
-        for program in programs:
-            if program == 'default' or program == 'mesh':
-                programs[program]['m_view_light'].write(self.light_handler.dir_light.m_view_light)
-                programs[program]['u_resolution'].write(glm.vec2(self.scene.graphics_engine.app.win_size))
-                self.depth_texture = self.scene.texture_handler.textures['depth_texture']
-                programs[program]['shadowMap'] = 3
-                self.depth_texture.use(location=3)
+        self.depth_texture = self.scene.texture_handler.textures['depth_texture']
+        self.depth_texture.use(location=3)
 
     def render_shadows(self):
         self.apply_shadow_shader_uniforms()
+        # Shadow casters are culled against the light's view
+        m_view_light = self.light_handler.dir_light.m_view_light
+        self.shadow_visible = self.bvh.cull(Frustum(self.scene.graphics_engine.camera.m_proj * m_view_light))
         # Render Models
-        programs = self.scene.vao_handler.program_handler.programs
-        programs['shadow_map']['m_view_light'].write(self.light_handler.dir_light.m_view_light)
+        # Casters keep the level of detail picked from the camera on purpose, the shadow map covers the camera's view
+        # so a caster small on screen casts a small shadow, and both passes draw the same geometry
+        if self.instancing:
+            self.instance_handler.update_shadows(self.world, self.shadow_visible, self.pixels_per_unit)
+            self.instance_handler.render_shadows()
         for obj_type in self.objects:
-            if obj_type != 'skybox':
+            if not self.is_instanced(obj_type):
                 for obj in self.objects[obj_type]:
-                    obj.render_shadow()
+                    if not self.shadow_visible[obj.index]: continue
+                    self.triangles += obj.render_shadow()
+                    self.draw_calls += 1
+
+    # Camera and lights come from the uniform buffers, only materials are written per group
+    def render_instanced(self):
+        self.instance_handler.render()
     
     def render(self):
         programs = self.scene.vao_handler.program_handler.programs
+        if self.instancing:
+            self.render_instanced()
         for obj_type in self.objects:
-            for program in programs:
-                if obj_type in ('container', 'metal_box', 'cat') and program == 'default':
-                    # Materials
-                    self.material_handler.materials[obj_type].write(programs[program])
-                    # Lighting
-                    self.light_handler.write(programs[program])
-                    # Basic Rendering
-                    programs[program]['view_pos'].write(self.scene.graphics_engine.camera.pos)
-                    programs[program]['m_view'].write(self.scene.graphics_engine.camera.m_view)
-                if obj_type in ('skybox') and program == 'skybox':
-                    programs[program]['m_view'].write(glm.mat4(glm.mat3(self.scene.graphics_engine.camera.m_view)))
-                    programs[program]['u_texture_skybox'] = 0
-                    self.scene.texture_handler.textures['skybox'].use(location=0)
-                if obj_type in ('meshes') and program == 'mesh':
-                    # Lighting
-                    self.light_handler.write(programs[program])
-                    programs[program]['view_pos'].write(self.scene.graphics_engine.camera.pos)
-                    # Basic Rendering
-                    programs[program]['m_view'].write(self.scene.graphics_engine.camera.m_view)
+            if self.is_instanced(obj_type): continue
+            if obj_type in ('container', 'metal_box', 'cat'):
+                # Materials, camera and lights come from the uniform buffers
+                self.material_handler.materials[obj_type].write(programs['default'])
 
             for obj in self.objects[obj_type]:
-                obj.render()
+                if not self.visible[obj.index]: continue
+                self.triangles += obj.render()
+                self.draw_calls += 1
 
 
-class Object:
+class Object(Body):
     def __init__(self, obj_handler, scene, model, vao='cube', material='container', pos=(0, 0, 0), rot=(0, 0, 0), scale=(1, 1, 1), hitbox_type = 'cube', hitbox_file_name = None, rot_vel = (0, 0, 0), vel = (0, 0, 0), mass = 1, immovable = False, gravity = True):
         
         # init variables
@@ -114,72 +156,20 @@ class Object:
         # material
         self.material = obj_handler.material_handler.materials[material] 
 
-        # model matrix variables
-        self.pos = glm.vec3(pos)
-        self.rot = glm.vec3([glm.radians(a) for a in rot])
-        self.scale = glm.vec3(scale)
-        
-        # physics variables
-        self.immovable = immovable
-        self.gravity = gravity
-        self.mass = mass if not immovable else 1e10
-
-        self.on_init(model, vao=vao, hitbox_type=hitbox_type, hitbox_file_name=hitbox_file_name, rot_vel=rot_vel, vel=vel)
-
-    def on_init(self, model, vao='cube', hitbox_type = 'cube', hitbox_file_name = None, rot_vel = (0, 0, 0), vel = (0, 0, 0)):
-        self.model = model(self, self.scene, vao)
-
-        self.hitbox = None
-        match hitbox_type:
-            case 'cube': self.define_hitbox_cube(vel, rot_vel)
-            case 'rectangle': self.define_hitbox_rectangle(hitbox_file_name, vel, rot_vel)
-            case 'fitted': self.define_hitbox_fitted(hitbox_file_name, vel, rot_vel)
-            case _: assert False, 'hitbox type is not recognized'
+        # model matrix and physics variables, the model is built once the body has its row in the world
+        self.model_type, self.vao_name = model, vao
+        super().__init__(obj_handler.world, pos, rot, scale, hitbox_type, hitbox_file_name, rot_vel, vel, mass, immovable, gravity)
+
+    def get_model(self):
+        return self.model_type(self, self.scene, self.vao_name)
             
     def render(self):
-        self.model.rot = glm.vec3([glm.radians(a) for a in self.rot])
-        self.model.render()
+        return self.model.render()
     
     def render_shadow(self):
-        self.model.render_shadow()
-        
-    def define_hitbox_cube(self, vel, rot_vel):
-        self.hitbox = CubeHitbox(self, vel, rot_vel)
-            
-    def define_hitbox_rectangle(self, file_name, vel, rot_vel):
-        assert file_name != None, 'hitbox needs file name to be created'
-        self.hitbox = FittedHitbox(self, file_name, True, vel, rot_vel)
-    
-    def define_hitbox_fitted(self, file_name, vel, rot_vel):
-        assert file_name != None, 'hitbox needs file name to be created'
-        self.hitbox = FittedHitbox(self, file_name, False, vel, rot_vel)
-        
-    # for physics
-    def move_tick(self, delta_time):
-        
-        self.pos += delta_time * self.hitbox.vel
-        self.rot += delta_time * self.hitbox.rot_vel
-        self.model.update()
-        
-    def move_tick_translate(self, delta_time):
-        
-        self.pos += delta_time * self.hitbox.vel
-        self.model.update()
-        
-    def move_tick_rot(self, delta_time):
-        
-        self.rot += delta_time * self.hitbox.rot_vel
-        self.model.update()
-        
-    def set_hitbox(self, hitbox):
-        
-        self.hitbox = hitbox
+        return self.model.render_shadow()
         
     def get_cartesian_vertices(self):
         
         vertices = [self.model_matrix * vertex for vertex in self.hitbox.vertices]
         return vertices
-    
-    def set_pos(self, pos):
-        
-        self.pos = pos
\ No newline at end of file
@@ -0,0 +1,209 @@
+import os
+import glm
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from body import Body, BodyModel
+from epa import Contact
+from hitboxes import Hitbox
+from asset_registry import registry
+from contact_cache import ContactCache
+from physics_engine import PhysicsEngine
+from rigid_body_world import RigidBodyWorld
+from profiler import profiler
+
+class ContactLog():
+
+    # stands in for the sleep handler in workers, contacts are replayed on the real one after the merge
+    def __init__(self):
+
+        self.pairs = []
+
+    def on_contact(self, obj1, obj2):
+
+        self.pairs.append((obj1.index, obj2.index))
+
+class IslandBody(Body):
+
+    # a body rebuilt in a worker over its row of the shared world, only the narrow phase uses it
+    def __init__(self, world, index, key):
+
+        self.world = world
+        self.index = index
+        self.sleep_timer = 0
+        self.island = None
+        self.model = BodyModel(self)
+        self.hitbox = Hitbox(self, registry.acquire('hitbox', key), self.vel, self.rot_vel, key)
+
+class IslandWorker():
+
+    # state a worker process keeps between tasks, the world maps the main process' shared blocks
+    def __init__(self):
+
+        self.world = RigidBodyWorld(0)
+        self.layout = None
+        self.bodies = {}
+        self.engine = None
+
+    def get_body(self, index, key):
+
+        body = self.bodies.get(index)
+        if body is None or body.hitbox.key != key: body = self.bodies[index] = IslandBody(self.world, index, key)
+
+        # other processes moved the body since this worker last saw it
+        body.model.update()
+        return body
+
+    def get_engine(self, resolver, iterations):
+
+        if self.engine and (self.engine.resolver, self.engine.iterations) == (resolver, iterations): return self.engine
+        self.engine = PhysicsEngine(0, resolver=resolver, iterations=iterations, sleep_handler=ContactLog())
+        return self.engine
+
+    # resolves islands given as (island, (n, 2) body indices, contact cache entries), positions and velocities are written
+    # straight to the shared rows, the cache entries of the island's pairs come back with its contacts
+    def resolve(self, layout, keys, islands, delta_time, resolver, iterations):
+
+        if layout != self.layout: self.world.attach(layout)
+        self.layout = layout
+        engine = self.get_engine(resolver, iterations)
+        bodies = {index : self.get_body(index, key) for index, key in keys.items()}
+
+        results = []
+        for island, pairs, entries in islands:
+
+            # every island starts from the main process' cache only, so its result does not depend on which worker ran it
+            cache = engine.contact_cache = ContactCache()
+            cache.set_entries(entries)
+            engine.contacts, engine.sleep_handler.pairs = [], []
+            engine.narrow_phase_tests, engine.collisions, engine.epa_iterations, engine.gjk_iterations = 0, 0, 0, 0
+            engine.resolve_pairs([(bodies[i], bodies[j]) for i, j in pairs.tolist()], delta_time)
+
+            contacts = [(obj1.index, obj2.index, tuple(contact.normal), contact.depth, tuple(contact.point1), tuple(contact.point2))
+                        for obj1, obj2, contact in engine.contacts]
+            counters = (engine.narrow_phase_tests, engine.collisions, engine.epa_iterations, engine.gjk_iterations,
+                        cache.lookups, cache.warm_starts, cache.early_outs)
+            results.append((island, contacts, engine.sleep_handler.pairs, counters, cache.get_entries(cache.entries)))
+        return results
+
+# one per worker process, created by its first task
+worker = None
+
+def resolve_islands(*args):
+
+    global worker
+    if worker is None: worker = IslandWorker()
+    return worker.resolve(*args)
+
+class ParallelPhysicsEngine(PhysicsEngine):
+
+    # narrow phase over independent contact islands in a process pool, world must be a shared rigid body world
+    def __init__(self, gravity_strength, world, workers = None, tasks_per_worker = 2, **kwargs):
+
+        super().__init__(gravity_strength, **kwargs)
+        assert world.shared, 'parallel narrow phase needs a shared rigid body world'
+        self.world = world
+        self.workers = workers if workers else os.cpu_count()
+
+        # more tasks than workers evens out islands of different sizes
+        self.tasks_per_worker = tasks_per_worker
+        self.executor = None
+        self.islands = 0
+
+    def get_executor(self):
+
+        if not self.executor: self.executor = ProcessPoolExecutor(self.workers)
+        return self.executor
+
+    def shutdown(self):
+
+        if self.executor: self.executor.shutdown()
+        self.executor = None
+
+    # pairs sharing a movable body land in the same island, immovable bodies are only read so they never join two islands
+    def build_islands(self, pairs):
+
+        parents = {}
+        def find(index):
+            while parents.setdefault(index, index) != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for obj1, obj2 in pairs:
+            if obj1.immovable or obj2.immovable: continue
+            root1, root2 = find(obj1.index), find(obj2.index)
+            if root1 != root2: parents[root2] = root1
+
+        # islands and their pairs keep broad phase order
+        islands = {}
+        for obj1, obj2 in pairs:
+            root = find(obj2.index if obj1.immovable else obj1.index)
+            islands.setdefault(root, []).append((obj1.index, obj2.index))
+        return list(islands.values())
+
+    # largest islands first, each to the task with the fewest pairs so far
+    def get_tasks(self, islands):
+
+        tasks = [[] for i in range(min(len(islands), self.workers * self.tasks_per_worker))]
+        loads = [0] * len(tasks)
+        for island in sorted(range(len(islands)), key=lambda i: -len(islands[i])):
+            task = loads.index(min(loads))
+            tasks[task].append(island)
+            loads[task] += len(islands[island])
+        return tasks
+
+    @profiler.profile('resolve_collisions')
+    def resolve_collisions(self, objects, delta_time):
+
+        self.narrow_phase_tests, self.collisions, self.epa_iterations, self.gjk_iterations = 0, 0, 0, 0
+        self.contacts = []
+        self.contact_cache.begin_frame()
+        islands = self.build_islands(list(self.broad_phase.get_pairs(objects)))
+        self.islands = len(islands)
+
+        # workers read matrices of immovable bodies as they are, so every row is current before dispatch
+        bodies = self.world.bodies
+        if islands:
+            self.world.update_model_matrices()
+            layout = self.world.get_layout()
+            futures = []
+            for task in self.get_tasks(islands):
+                keys = {index : bodies[index].hitbox.key for island in task for pair in islands[island] for index in pair}
+                pairs = [(island, np.array(islands[island], dtype='i4'), self.get_cache_entries(islands[island])) for island in task]
+                futures.append(self.get_executor().submit(resolve_islands, layout, keys, pairs, delta_time, self.resolver, self.iterations))
+
+            # islands touch disjoint rows, merging in island order keeps contacts and wakes independent of the worker count
+            results = sorted((result for future in futures for result in future.result()), key=lambda result: result[0])
+            for island, contacts, touches, counters, entries in results:
+                self.merge(contacts, touches, counters, entries)
+                for index in {index for pair in islands[island] for index in pair}: bodies[index].model.update()
+
+        self.contact_cache.end_frame()
+        self.sleep_handler.update(objects, self.contacts, delta_time)
+        if profiler.enabled: self.count_profiler()
+
+    # the main process keeps the contact cache between steps, workers get the entries of their islands' pairs
+    def get_cache_entries(self, pairs):
+
+        return self.contact_cache.get_entries([ContactCache.get_index_key(index1, index2) for index1, index2 in pairs])
+
+    def merge(self, contacts, touches, counters, entries):
+
+        bodies = self.world.bodies
+        for index1, index2 in touches: self.sleep_handler.on_contact(bodies[index1], bodies[index2])
+        for index1, index2, normal, depth, point1, point2 in contacts:
+            self.contacts.append((bodies[index1], bodies[index2], Contact(glm.vec3(normal), depth, glm.vec3(point1), glm.vec3(point2))))
+
+        tests, collisions, epa_iterations, gjk_iterations, *cache_counters = counters
+        self.narrow_phase_tests += tests
+        self.collisions += collisions
+        self.epa_iterations += epa_iterations
+        self.gjk_iterations += gjk_iterations
+        self.contact_cache.set_entries(entries)
+        self.contact_cache.add_stats(*cache_counters)
+
+    def get_stats(self):
+
+        stats = super().get_stats()
+        stats['contact_islands'] = self.islands
+        return stats
@@ -1,5 +1,6 @@
 import glm
 from gjk import *
+from profiler import profiler
 
 class PBS():
     
@@ -22,6 +23,7 @@ class PBS():
         self.rot_vel1 = 0
         self.rot_vel2 = 0
         
+    @profiler.profile('pbs', trace=False)
     def uncollide_objects(self, obj1, obj2, delta_time):
         
         for direction in [1, 2, 0]:
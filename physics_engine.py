@@ -0,0 +1,144 @@
+import glm
+from gjk import GJK
+from epa import EPA
+from physics_binary_search import PBS
+from broad_phase import SweepAndPrune
+from contact_cache import ContactCache
+from sleep_handler import SleepHandler
+from continuous_collision import ContinuousCollision
+from profiler import profiler
+
+class PhysicsEngine():
+
+    def __init__(self, gravity_strength, broad_phase = None, resolver = 'epa', iterations = 4, sleep_handler = None, continuous_collision = True):
+
+        self.gravity_strength = gravity_strength
+
+        # collision pipeline
+        self.broad_phase = broad_phase if broad_phase else SweepAndPrune()
+        self.gjk = GJK()
+        self.epa = EPA(self.gjk)
+        self.pbs = PBS(self)
+        self.contact_cache = ContactCache()
+        self.sleep_handler = sleep_handler if sleep_handler else SleepHandler()
+
+        # sweeps fast bodies before they move so they cannot pass through thin bodies, None or False turns it off
+        if continuous_collision is True: continuous_collision = ContinuousCollision()
+        self.continuous_collision = continuous_collision if continuous_collision else None
+
+        # 'epa' separates pairs in one step, 'binary_search' uses the older per axis pbs search
+        self.resolver = resolver
+
+        # extra passes over touching pairs so corrections in a stack settle together
+        self.iterations = iterations
+
+        # counters for benchmarking
+        self.narrow_phase_tests = 0
+        self.collisions = 0
+        self.epa_iterations = 0
+        self.gjk_iterations = 0
+        self.contacts = []
+
+    def set_broad_phase(self, broad_phase):
+
+        self.broad_phase = broad_phase
+
+    @profiler.profile('resolve_collisions')
+    def resolve_collisions(self, objects, delta_time):
+
+        self.narrow_phase_tests, self.collisions, self.epa_iterations, self.gjk_iterations = 0, 0, 0, 0
+        self.contacts = []
+        self.contact_cache.begin_frame()
+
+        # only pairs with overlapping bounds reach gjk
+        self.resolve_pairs(self.broad_phase.get_pairs(objects), delta_time)
+
+        self.contact_cache.end_frame()
+        self.sleep_handler.update(objects, self.contacts, delta_time)
+        if profiler.enabled: self.count_profiler()
+
+    def count_profiler(self):
+
+        profiler.count('pairs', self.broad_phase.candidate_pairs)
+        profiler.count('narrow_phase_tests', self.narrow_phase_tests)
+        profiler.count('gjk_iterations', self.gjk_iterations)
+        profiler.count('collisions', self.collisions)
+
+    # resolves every pair once, then repeats the ones still touching
+    def resolve_pairs(self, pairs, delta_time):
+
+        touching = [pair for pair in pairs if self.resolve_pair(*pair, delta_time)]
+
+        if self.resolver != 'binary_search':
+            for i in range(self.iterations - 1):
+                touching = [pair for pair in touching if self.resolve_pair(*pair, delta_time)]
+                if not touching: break
+
+    # returns whether the pair was colliding
+    def resolve_pair(self, obj1, obj2, delta_time):
+
+        self.narrow_phase_tests += 1
+        start_vec = self.contact_cache.get_start_vector(obj1, obj2)
+        collided, simplex = self.gjk.get_gjk_collision(obj1.hitbox, obj2.hitbox, start_vec)
+        self.gjk_iterations += self.gjk.iterations
+        if not collided:
+            early_out = start_vec is not None and self.gjk.iterations == 1
+            self.contact_cache.store_separation(obj1, obj2, self.gjk.separating_axis, early_out)
+            return False
+
+        self.collisions += 1
+        self.sleep_handler.on_contact(obj1, obj2)
+        if self.resolver == 'binary_search':
+            self.pbs.uncollide_objects(obj1, obj2, delta_time)
+            return True
+
+        contact = self.epa.get_contact(obj1.hitbox, obj2.hitbox, simplex)
+        self.epa_iterations += self.epa.iterations
+        self.contact_cache.store_contact(obj1, obj2, simplex, contact)
+        if not contact: return True
+
+        self.contacts.append((obj1, obj2, contact))
+        self.separate_objects(obj1, obj2, contact)
+        self.apply_contact_impulse(obj1, obj2, contact)
+        return True
+
+    def get_inverse_mass(self, obj):
+
+        return 0 if obj.immovable else 1 / obj.mass
+
+    # pushes both objects out along the contact normal, split by inverse mass
+    def separate_objects(self, obj1, obj2, contact):
+
+        inverse_mass1, inverse_mass2 = self.get_inverse_mass(obj1), self.get_inverse_mass(obj2)
+        total = inverse_mass1 + inverse_mass2
+        if total == 0: return
+
+        correction = contact.normal * (contact.depth / total)
+        if inverse_mass1: obj1.translate(-correction * inverse_mass1)
+        if inverse_mass2: obj2.translate(correction * inverse_mass2)
+
+    # removes the approaching part of the relative velocity so resting bodies stop sinking
+    def apply_contact_impulse(self, obj1, obj2, contact):
+
+        inverse_mass1, inverse_mass2 = self.get_inverse_mass(obj1), self.get_inverse_mass(obj2)
+        total = inverse_mass1 + inverse_mass2
+        if total == 0: return
+
+        approach = glm.dot(obj2.hitbox.vel - obj1.hitbox.vel, contact.normal)
+        if approach >= 0: return
+
+        impulse = contact.normal * (-approach / total)
+        if inverse_mass1: obj1.hitbox.set_vel(obj1.hitbox.vel - impulse * inverse_mass1)
+        if inverse_mass2: obj2.hitbox.set_vel(obj2.hitbox.vel + impulse * inverse_mass2)
+
+    def get_stats(self):
+
+        stats = self.broad_phase.get_stats()
+        stats['narrow_phase_tests'] = self.narrow_phase_tests
+        stats['collisions'] = self.collisions
+        stats['epa_iterations'] = self.epa_iterations
+        stats['gjk_iterations'] = self.gjk_iterations
+        stats.update(self.contact_cache.get_stats())
+        stats.update(self.sleep_handler.get_stats())
+        if self.continuous_collision: stats.update(self.continuous_collision.get_stats())
+        return stats
@@ -0,0 +1,90 @@
+import random
+import glm
+from body import Body
+from physics_engine import PhysicsEngine
+from parallel_narrow_phase import ParallelPhysicsEngine
+from rigid_body_world import RigidBodyWorld
+
+class PhysicsWorld():
+
+    # bodies and the collision pipeline without a window or gl context, the game's object handler steps one as well
+    # workers above 0 resolve contact islands in that many processes over a shared world
+    def __init__(self, gravity_strength = -9.8, seed = None, physics_engine = None, workers = 0):
+
+        self.world = RigidBodyWorld(shared=workers > 0)
+        if physics_engine: self.pe = physics_engine
+        elif workers: self.pe = ParallelPhysicsEngine(gravity_strength, self.world, workers)
+        else: self.pe = PhysicsEngine(gravity_strength)
+        self.bodies = []
+
+        # every random choice in a scene comes from here, so a seed reproduces the run
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        # bodies falling below respawn_height are dropped again at a random point of respawn_box, ((x, y, z) min, (x, y, z) max)
+        self.respawn_height = None
+        self.respawn_box = None
+        self.steps = 0
+
+        # gets every step's delta time when set, see recorder.py
+        self.recorder = None
+
+    # takes the Body arguments, rot in degrees, kind only matters to renderers
+    def add_body(self, kind = None, **kwargs):
+
+        body = Body(self.world, **kwargs)
+        self.bodies.append(body)
+        return body
+
+    def get_random_position(self, low, high):
+
+        return glm.vec3([self.rng.randint(a, b) for a, b in zip(low, high)])
+
+    # one physics step over bodies, by default every body added here
+    def step(self, delta_time, bodies = None):
+
+        # fast bodies that would pass into another body this step stop where they first touch it
+        bodies = self.bodies if bodies is None else bodies
+        self.world.store_previous()
+        impacts = self.pe.continuous_collision.get_impacts(self.world, delta_time, bodies) if self.pe.continuous_collision else []
+
+        # changes pos and vel of every awake body in one vectorized step
+        moved = self.world.integrate(delta_time, (0, self.pe.gravity_strength, 0))
+        if impacts: self.pe.continuous_collision.apply_impacts(self.world, impacts)
+        for index in moved:
+            self.world.bodies[index].model.update()
+        self.world.update_model_matrices()
+
+        if self.respawn_height is not None:
+            for index in moved[self.world.pos[moved, 1] < self.respawn_height]:
+                body = self.world.bodies[index]
+                body.set_pos(self.get_random_position(*self.respawn_box))
+                body.hitbox.set_vel(glm.vec3(0, 0, 0))
+
+        self.pe.resolve_collisions(bodies, delta_time)
+        self.steps += 1
+        if self.recorder: self.recorder.record_step(delta_time)
+
+    # releases shared hitbox geometry, stops worker processes and frees shared memory
+    def close(self):
+
+        for body in self.bodies: body.release()
+        if isinstance(self.pe, ParallelPhysicsEngine): self.pe.shutdown()
+        if self.world.shared: self.world.release()
+
+# the game's opening scene, boxes dropped onto tilted slabs and dropped again once they fall past them,
+# add(kind, **body arguments) creates each body, by default a bare physics body
+def build_box_rain(physics, add = None, slabs = 20, boxes = 20):
+
+    add = add if add else physics.add_body
+    rng = physics.rng
+    for i in range(slabs):
+        add('metal_box', pos=(rng.randint(-20, 20), rng.randint(-30, 0), rng.randint(-20, 20)), scale=(5, 0.5, 5),
+            rot=(rng.randint(-180, 180), rng.randint(-180, 180), rng.randint(-180, 180)), immovable=True, gravity=False)
+    for i in range(boxes):
+        add('metal_box', pos=(rng.randint(-20, 20), rng.randint(10, 20), rng.randint(-20, 20)), scale=(0.5, 0.5, 0.5))
+    physics.respawn_height = -30
+    physics.respawn_box = ((-20, 10, -20), (20, 20, 20))
+
+# scenes recordings can name, so a replay rebuilds the same bodies
+SCENES = {'box_rain' : build_box_rain}
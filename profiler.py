@@ -0,0 +1,155 @@
+import json
+import time
+import functools
+import numpy as np
+
+class Scope():
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+
+        self.profiler.add_event(self.name, self.start, time.perf_counter() - self.start)
+
+class NullScope():
+
+    def __enter__(self): pass
+
+    def __exit__(self, *exception): pass
+
+class Profiler():
+
+    # scoped timers and counters per frame, the last frames are kept in a ring buffer
+    def __init__(self, frames = 600, max_events = 256):
+
+        self.enabled = False
+        self.null_scope = NullScope()
+
+        # trace events kept per frame, scope totals still count the calls past it
+        self.max_events = max_events
+
+        # ring buffer of (start, duration, {scope: (seconds, calls)}, {counter: value}, [(scope, start, duration)])
+        self.samples = [None] * frames
+        self.frame_times = np.zeros(frames)
+        self.frame = 0
+
+        self.frame_start = None
+        self.reset_frame()
+
+    def reset_frame(self):
+
+        self.scopes = {}
+        self.counters = {}
+        self.events = []
+
+    def enable(self, enabled = True):
+
+        self.enabled = enabled
+        self.frame_start = None
+        self.reset_frame()
+
+    # with profiler.scope(name): ..., a shared no-op when disabled
+    def scope(self, name):
+
+        return Scope(self, name) if self.enabled else self.null_scope
+
+    # decorator timing every call of a function, a disabled profiler only costs the flag check.
+    # functions called many times a frame pass trace=False and only add to their scope's totals
+    def profile(self, name, trace = True):
+
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return function(*args, **kwargs)
+                start = time.perf_counter()
+                try: return function(*args, **kwargs)
+                finally: self.add_event(name, start, time.perf_counter() - start, trace)
+            return wrapper
+        return decorate
+
+    def add_event(self, name, start, duration, trace = True):
+
+        seconds, calls = self.scopes.get(name, (0, 0))
+        self.scopes[name] = (seconds + duration, calls + 1)
+        if trace and len(self.events) < self.max_events: self.events.append((name, start, duration))
+
+    def count(self, name, value = 1):
+
+        if self.enabled: self.counters[name] = self.counters.get(name, 0) + value
+
+    def begin_frame(self):
+
+        if not self.enabled: return
+        self.frame_start = time.perf_counter()
+        self.reset_frame()
+
+    def end_frame(self):
+
+        if not self.enabled or self.frame_start is None: return
+        duration = time.perf_counter() - self.frame_start
+        index = self.frame % len(self.samples)
+        self.samples[index] = (self.frame_start, duration, self.scopes, self.counters, self.events)
+        self.frame_times[index] = duration
+        self.frame += 1
+        self.reset_frame()
+
+    def get_samples(self):
+
+        # oldest first
+        if self.frame <= len(self.samples): return self.samples[:self.frame]
+        index = self.frame % len(self.samples)
+        return self.samples[index:] + self.samples[:index]
+
+    def get_percentiles(self, percentiles = (50, 95, 99)):
+
+        frame_ms = self.frame_times[:min(self.frame, len(self.samples))] * 1e3
+        if not len(frame_ms): return {}
+        return {f'p{percentile}_ms' : float(value) for percentile, value in zip(percentiles, np.percentile(frame_ms, percentiles))}
+
+    # frame time percentiles and per frame averages of every scope and counter over the kept frames
+    def get_stats(self):
+
+        samples = self.get_samples()
+        if not samples: return {'frames' : 0}
+        stats = {'frames' : len(samples), 'mean_ms' : float(self.frame_times[:len(samples)].mean() * 1e3)}
+        stats.update(self.get_percentiles())
+
+        scopes, counters = {}, {}
+        for start, duration, frame_scopes, frame_counters, events in samples:
+            for name, (seconds, calls) in frame_scopes.items():
+                total_seconds, total_calls = scopes.get(name, (0, 0))
+                scopes[name] = (total_seconds + seconds, total_calls + calls)
+            for name, value in frame_counters.items(): counters[name] = counters.get(name, 0) + value
+        stats['scopes'] = {name : {'ms' : seconds * 1e3 / len(samples), 'calls' : calls / len(samples)} for name, (seconds, calls) in scopes.items()}
+        stats['counters'] = {name : value / len(samples) for name, value in counters.items()}
+        return stats
+
+    # trace event format, opens in chrome://tracing and perfetto
+    def get_chrome_trace(self):
+
+        samples = self.get_samples()
+        origin = samples[0][0] if samples else 0
+        events = []
+        for start, duration, scopes, counters, frame_events in samples:
+            events.append({'name' : 'frame', 'ph' : 'X', 'ts' : (start - origin) * 1e6, 'dur' : duration * 1e6, 'pid' : 0, 'tid' : 0})
+            events.extend({'name' : name, 'ph' : 'X', 'ts' : (event_start - origin) * 1e6, 'dur' : event_duration * 1e6, 'pid' : 0, 'tid' : 0}
+                          for name, event_start, event_duration in frame_events)
+            if counters: events.append({'name' : 'counters', 'ph' : 'C', 'ts' : (start - origin) * 1e6, 'pid' : 0, 'args' : counters})
+        return {'traceEvents' : events, 'displayTimeUnit' : 'ms'}
+
+    def export_chrome_trace(self, path):
+
+        with open(path, 'w') as file:
+            json.dump(self.get_chrome_trace(), file)
+
+# shared by every instrumented module
+profiler = Profiler()
@@ -0,0 +1,141 @@
+import sys
+import json
+import time
+import zlib
+import struct
+import numpy as np
+from physics_world import PhysicsWorld, SCENES
+
+# recording file, a header and json metadata followed by the zlib compressed arrays it lists
+MAGIC = b'RREC'
+VERSION = 1
+HEADER = struct.Struct('<4sII') # magic, version, metadata length
+
+# per rendered frame: frame delta time, physics steps taken so far, camera position, yaw and pitch
+FRAME_COLUMNS = 7
+
+# pos, rot, vel and rot_vel of the stepped bodies in step order, then their flags
+def get_snapshot(physics):
+
+    world = physics.world
+    indices = [body.index for body in physics.bodies]
+    return np.concatenate([world.pos[indices], world.rot[indices], world.vel[indices], world.rot_vel[indices],
+                           world.flags[indices, None].astype('f4')], axis=1)
+
+class Recording():
+
+    def __init__(self, seed, scene, snapshot_interval, step_times, frames, snapshot_steps, snapshots):
+
+        self.seed = seed
+        self.scene = scene
+        self.snapshot_interval = snapshot_interval
+        self.step_times = step_times
+        self.frames = frames
+        self.snapshot_steps = snapshot_steps
+        self.snapshots = snapshots
+
+class Recorder():
+
+    # records what a run depends on: the seed and scene, every physics step's delta time, camera input per frame,
+    # and every snapshot_interval steps the state of all bodies
+    def __init__(self, physics, scene = 'box_rain', snapshot_interval = 60):
+
+        self.physics = physics
+        self.scene = scene
+        self.snapshot_interval = snapshot_interval
+        self.step_times = []
+        self.frames = []
+        self.snapshot_steps = []
+        self.snapshots = []
+
+        physics.recorder = self
+        self.take_snapshot()
+
+    def record_step(self, delta_time):
+
+        self.step_times.append(delta_time)
+        if len(self.step_times) % self.snapshot_interval == 0: self.take_snapshot()
+
+    def record_frame(self, delta_time, camera):
+
+        self.frames.append((delta_time, len(self.step_times), *camera.position, camera.yaw, camera.pitch))
+
+    def take_snapshot(self):
+
+        self.snapshot_steps.append(len(self.step_times))
+        self.snapshots.append(get_snapshot(self.physics))
+
+    def get_recording(self):
+
+        return Recording(self.physics.seed, self.scene, self.snapshot_interval, np.array(self.step_times, dtype='f8'),
+                         np.array(self.frames, dtype='f8').reshape(-1, FRAME_COLUMNS), np.array(self.snapshot_steps, dtype='u4'),
+                         np.array(self.snapshots, dtype='f4'))
+
+    def save(self, path):
+
+        write_recording(path, self.get_recording())
+
+def write_recording(path, recording):
+
+    arrays = {'step_times' : recording.step_times, 'frames' : recording.frames, 'snapshot_steps' : recording.snapshot_steps,
+              'snapshots' : recording.snapshots}
+    metadata = {'seed' : recording.seed, 'scene' : recording.scene, 'snapshot_interval' : recording.snapshot_interval,
+                'arrays' : [(name, array.dtype.str, array.shape) for name, array in arrays.items()]}
+    metadata = json.dumps(metadata).encode()
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(metadata)))
+        file.write(metadata)
+        file.write(zlib.compress(b''.join(np.ascontiguousarray(array).tobytes() for array in arrays.values())))
+
+def read_recording(path):
+
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION: raise ValueError(f'{path} is not a version {VERSION} recording')
+    metadata = json.loads(data[HEADER.size:HEADER.size + length])
+    payload = zlib.decompress(data[HEADER.size + length:])
+
+    arrays, offset = {}, 0
+    for name, dtype, shape in metadata['arrays']:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        offset += size
+    return Recording(metadata['seed'], metadata['scene'], metadata['snapshot_interval'], **arrays)
+
+# re-runs a recording headlessly at full speed, checking the state against every snapshot.
+# times per snapshot interval show where a slowdown starts, first_divergence where two engine versions part
+def replay(recording, tolerance = 0):
+
+    physics = PhysicsWorld(seed=recording.seed)
+    SCENES[recording.scene](physics)
+    expected = dict(zip(recording.snapshot_steps.tolist(), recording.snapshots))
+
+    errors, interval_times, first_divergence = [], [], None
+    def check(step):
+        nonlocal first_divergence
+        if step not in expected: return
+        error = float(np.abs(get_snapshot(physics) - expected[step]).max())
+        errors.append(error)
+        if error > tolerance and first_divergence is None: first_divergence = step
+
+    check(0)
+    start = interval_start = time.perf_counter()
+    for step, delta_time in enumerate(recording.step_times.tolist(), 1):
+        physics.step(delta_time)
+        if step in expected:
+            interval_times.append((time.perf_counter() - interval_start) * 1e3)
+            check(step)
+            interval_start = time.perf_counter()
+    elapsed = time.perf_counter() - start
+
+    steps = len(recording.step_times)
+    return {'seed' : recording.seed, 'scene' : recording.scene, 'steps' : steps, 'frames' : len(recording.frames),
+            'recorded_seconds' : float(recording.step_times.sum()), 'replay_seconds' : elapsed, 'steps_per_second' : steps / elapsed if elapsed else 0,
+            'snapshots_checked' : len(errors), 'max_error' : max(errors, default=0), 'first_divergence' : first_divergence,
+            'interval_ms' : interval_times}
+
+if __name__ == '__main__':
+    # python recorder.py recording.rrec
+    print(json.dumps(replay(read_recording(sys.argv[1])), indent=2))
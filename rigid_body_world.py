@@ -0,0 +1,186 @@
+import glm
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+
+# body flags
+IMMOVABLE = 1
+GRAVITY = 2
+SLEEPING = 4
+
+class RigidBodyWorld():
+
+    # packed per body state, objects read and write their own row
+    # shared worlds keep every array in shared memory so worker processes can map the same rows
+    def __init__(self, capacity = 64, shared = False):
+
+        self.count = 0
+        self.capacity = 0
+        self.bodies = []
+        self.shared = shared
+        self.shared_memory = {}
+        self.fields = {'pos' : ((3,), 'f4'), 'rot' : ((3,), 'f4'), 'prev_pos' : ((3,), 'f4'), 'prev_rot' : ((3,), 'f4'),
+                       'vel' : ((3,), 'f4'), 'rot_vel' : ((3,), 'f4'), 'mass' : ((), 'f4'), 'flags' : ((), 'u1'),
+                       'scale' : ((3,), 'f4'), 'model_matrix' : ((4, 4), 'f4'), 'render_matrix' : ((4, 4), 'f4'), 'dirty' : ((), '?'),
+                       'bound_min' : ((3,), 'f4'), 'bound_max' : ((3,), 'f4')}
+        for name, (shape, dtype) in self.fields.items():
+            setattr(self, name, np.zeros((0, *shape), dtype=dtype))
+        self.reserve(capacity)
+
+    def reserve(self, capacity):
+
+        if capacity <= self.capacity: return
+        retired, self.shared_memory = self.shared_memory, {}
+        for name, (shape, dtype) in self.fields.items():
+            array = self.allocate(name, (capacity, *shape), dtype)
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+        # old blocks can only be closed once no array views them
+        for memory in retired.values(): self.free(memory, True)
+        self.capacity = capacity
+
+    def allocate(self, name, shape, dtype):
+
+        if not self.shared: return np.zeros(shape, dtype=dtype)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        memory = self.shared_memory[name] = SharedMemory(create=True, size=max(1, size))
+        array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        array[:] = 0
+        return array
+
+    def free(self, memory, unlink):
+
+        memory.close()
+        if unlink: memory.unlink()
+
+    # names of the shared blocks, they change whenever the world grows
+    def get_layout(self):
+
+        return self.capacity, tuple((name, self.shared_memory[name].name) for name in self.fields)
+
+    # maps the arrays of a shared world created in another process, rows are written in place
+    def attach(self, layout):
+
+        capacity, blocks = layout
+        retired, self.shared_memory = self.shared_memory, {}
+        for name, block in blocks:
+            memory = self.shared_memory[name] = SharedMemory(name=block)
+            shape, dtype = self.fields[name]
+            setattr(self, name, np.ndarray((capacity, *shape), dtype=dtype, buffer=memory.buf))
+        for memory in retired.values(): self.free(memory, False)
+        self.capacity = self.count = capacity
+
+    # closes the shared blocks, the creating world also removes them
+    def release(self):
+
+        for name, (shape, dtype) in self.fields.items():
+            setattr(self, name, np.zeros((0, *shape), dtype=dtype))
+        for memory in self.shared_memory.values(): self.free(memory, self.shared)
+        self.shared_memory = {}
+        self.count = self.capacity = 0
+
+    # returns the row index of the new body
+    def add_body(self, body, pos = (0, 0, 0), rot = (0, 0, 0), vel = (0, 0, 0), rot_vel = (0, 0, 0), mass = 1, immovable = False, gravity = True, scale = (1, 1, 1)):
+
+        if self.count == self.capacity: self.reserve(max(64, 2 * self.capacity))
+        index = self.count
+        self.count += 1
+        self.bodies.append(body)
+
+        self.pos[index] = self.prev_pos[index] = pos
+        self.rot[index] = self.prev_rot[index] = rot
+        self.vel[index], self.rot_vel[index] = vel, rot_vel
+        self.mass[index] = mass
+        self.flags[index] = (IMMOVABLE if immovable else 0) | (GRAVITY if gravity else 0)
+        self.scale[index] = scale
+        self.dirty[index] = True
+        return index
+
+    # local space bounds of the body's shape, used for culling
+    def set_bounds(self, index, mins, maxs):
+
+        self.bound_min[index], self.bound_max[index] = mins, maxs
+
+    def get_flag(self, index, flag):
+
+        return bool(self.flags[index] & flag)
+
+    def set_flag(self, index, flag, value):
+
+        if value: self.flags[index] |= flag
+        else: self.flags[index] &= ~np.uint8(flag)
+
+    def get_awake_mask(self):
+
+        return (self.flags[:self.count] & (IMMOVABLE | SLEEPING)) == 0
+
+    # remembers the pose at the start of the step for render interpolation
+    def store_previous(self):
+
+        self.prev_pos[:self.count] = self.pos[:self.count]
+        self.prev_rot[:self.count] = self.rot[:self.count]
+
+    # moves every awake body by its velocity, then applies gravity, returns the indices that moved
+    def integrate(self, delta_time, gravity):
+
+        n = self.count
+        awake = self.get_awake_mask()
+        step = np.where(awake, np.float32(delta_time), np.float32(0))[:, None]
+
+        self.pos[:n] += step * self.vel[:n]
+        self.rot[:n] += step * self.rot_vel[:n]
+
+        falling = (self.flags[:n] & GRAVITY) != 0
+        self.vel[:n] += np.where(falling[:, None], step, 0) * np.asarray(gravity, dtype='f4')
+        self.dirty[:n] |= awake
+        return np.flatnonzero(awake)
+
+    # T * Rx * Ry * Rz * S per row, stored column major like glm so rows can be uploaded as is
+    def compute_model_matrices(self, pos, rot, scale):
+
+        (cx, cy, cz), (sx, sy, sz) = np.cos(rot).T, np.sin(rot).T
+        rotation = np.empty((len(pos), 3, 3), dtype='f4')
+        rotation[:, 0, 0], rotation[:, 0, 1], rotation[:, 0, 2] = cy * cz, -cy * sz, sy
+        rotation[:, 1, 0], rotation[:, 1, 1], rotation[:, 1, 2] = sx * sy * cz + cx * sz, cx * cz - sx * sy * sz, -sx * cy
+        rotation[:, 2, 0], rotation[:, 2, 1], rotation[:, 2, 2] = sx * sz - cx * sy * cz, cx * sy * sz + sx * cz, cx * cy
+
+        matrices = np.zeros((len(pos), 4, 4), dtype='f4')
+        matrices[:, :3, :3] = (rotation * scale[:, None, :]).transpose(0, 2, 1)
+        matrices[:, 3, :3] = pos
+        matrices[:, 3, 3] = 1
+        return matrices
+
+    # recomputes the physics matrices of every body that moved since the last call
+    def update_model_matrices(self):
+
+        dirty = np.flatnonzero(self.dirty[:self.count])
+        if len(dirty):
+            self.model_matrix[dirty] = self.compute_model_matrices(self.pos[dirty], self.rot[dirty], self.scale[dirty])
+            self.dirty[dirty] = False
+        return len(dirty)
+
+    def get_model_matrix(self, index):
+
+        if self.dirty[index]:
+            self.model_matrix[index] = self.compute_model_matrices(self.pos[index:index + 1], self.rot[index:index + 1], self.scale[index:index + 1])[0]
+            self.dirty[index] = False
+        return self.model_matrix[index]
+
+    # matrices at the pose blended between the last two physics steps, read by every render pass
+    def update_render_matrices(self, alpha):
+
+        n = self.count
+        self.update_model_matrices()
+        if alpha >= 1:
+            self.render_matrix[:n] = self.model_matrix[:n]
+            return
+
+        # only bodies that moved in the last step have a pose to blend, sleeping and immovable ones keep their matrix.
+        # past half the bodies blending every row costs less than gathering the moved ones
+        changed = (self.pos[:n] != self.prev_pos[:n]) | (self.rot[:n] != self.prev_rot[:n])
+        moved = np.flatnonzero(changed[:, 0] | changed[:, 1] | changed[:, 2])
+        if 2 * len(moved) > n: moved = slice(0, n)
+        else: self.render_matrix[:n] = self.model_matrix[:n]
+        pos = self.prev_pos[moved] + alpha * (self.pos[moved] - self.prev_pos[moved])
+        rot = self.prev_rot[moved] + alpha * (self.rot[moved] - self.prev_rot[moved])
+        self.render_matrix[moved] = self.compute_model_matrices(pos, rot, self.scale[moved])
@@ -2,15 +2,29 @@ from object_handler import ObjectHandler
 from vao_handler import VAOHandler
 from texture_handler import TextureHandler
 from light_handler import LightHandler
+from asset_loader import AssetLoader
+from uniform_buffer_handler import UniformBufferHandler
+from clustered_lighting import ClusteredLighting
+from camera import NEAR, FAR
+from profiler import profiler
 
 class Scene:
     def __init__(self, graphics_engine) -> None:
         self.graphics_engine = graphics_engine
         self.ctx = graphics_engine.ctx
 
-        self.vao_handler = VAOHandler(self.ctx)
-        self.texture_handler = TextureHandler(self.graphics_engine.app)
+        # Meshes and textures decode in the background, placeholders are drawn until they are uploaded
+        self.asset_loader = AssetLoader()
+        self.vao_handler = VAOHandler(self.ctx, self.asset_loader)
+        self.texture_handler = TextureHandler(self.ctx, self.graphics_engine.app.win_size, self.asset_loader)
         self.light_handler = LightHandler()
+        # Per frame camera and light data for every program
+        self.uniform_buffers = UniformBufferHandler(self.ctx)
+        # Point lights are assigned to view space clusters every frame
+        self.clustered_lighting = ClusteredLighting(self.ctx, self.graphics_engine.app.win_size, NEAR, FAR)
+        # Programs are compiled on first use, later ones are bound as they come
+        self.clustered_lighting.bind_programs(self.vao_handler.program_handler.programs)
+        self.vao_handler.program_handler.on_compile.append(self.clustered_lighting.bind_program)
         self.objects = ObjectHandler(self)
 
         # Depth buffer
@@ -20,6 +34,21 @@ class Scene:
         self.shadow_timer = 5
         self.shadow_frame_skips = 5
 
+        # Fixed timestep physics
+        self.physics_step = 1 / self.graphics_engine.app.physics_hz
+        self.max_substeps = self.graphics_engine.app.max_substeps
+        self.accumulator = 0
+        self.alpha = 1
+
+    # Releases registry references and gl resources on quit
+    def destroy(self):
+        self.asset_loader.destroy()
+        self.objects.destroy()
+        self.vao_handler.destroy()
+        self.texture_handler.destroy()
+        self.uniform_buffers.destroy()
+        self.clustered_lighting.destroy()
+
     def render_main(self):
         self.ctx.screen.use()
         self.objects.render()
@@ -29,14 +58,38 @@ class Scene:
         self.depth_fbo.use()
         self.objects.render_shadows()
 
-    def render(self, delta_time):
-        # Update
-        self.objects.update(delta_time)
+    def update(self, delta_time):
+        # Clock ticks in milliseconds, physics steps in seconds
+        self.accumulator += delta_time / 1000
+        substeps = 0
+        while self.accumulator >= self.physics_step and substeps < self.max_substeps:
+            self.objects.update(self.physics_step)
+            self.accumulator -= self.physics_step
+            substeps += 1
+        # A hitch drops the time it could not catch up on instead of taking oversized steps
+        if self.accumulator >= self.physics_step:
+            self.accumulator %= self.physics_step
+        # Blend factor between the last two physics states
+        self.alpha = self.accumulator / self.physics_step
+
+    def render(self):
+        with profiler.scope('render.update'):
+            # Finished assets are uploaded within a small per frame budget
+            self.asset_loader.update()
+            # Model matrices at the interpolated pose for both passes
+            self.objects.update_render(self.alpha)
+            # Camera and lights, written only when they changed
+            self.uniform_buffers.update(self.graphics_engine.camera, self.light_handler)
+            self.clustered_lighting.update(self.graphics_engine.camera, self.light_handler)
         # Pass 1
         if self.shadow_timer // self.shadow_frame_skips:
-            self.render_shadow()
+            with profiler.scope('render.shadow'):
+                self.render_shadow()
             self.shadow_timer = 0
         else:
             self.shadow_timer += 1
         # Pass 2
-        self.render_main()
\ No newline at end of file
+        with profiler.scope('render.main'):
+            self.render_main()
+        profiler.count('draw_calls', self.objects.get_draw_calls())
+        profiler.count('triangles', self.objects.get_triangles())
\ No newline at end of file
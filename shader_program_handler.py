@@ -1,20 +1,92 @@
+import time
+import hashlib
+from uniform_buffer_handler import UniformBufferHandler
+
+
+# Program name -> (shader file name, defines), variants are #define permutations of one source pair
+VARIANTS = {
+    'default': ('default', ()),
+    # Instanced variants read the model matrix from a per instance attribute
+    'default_instanced': ('default', ('INSTANCED',)),
+    'shadow_map': ('shadow_map', ()),
+    'shadow_map_instanced': ('shadow_map', ('INSTANCED',)),
+}
 
 
 class ProgramHandler:
-    def __init__(self, ctx):
+    def __init__(self, ctx, clustered_lighting=True):
         self.ctx = ctx
-        self.programs = {}
+        # Defines for every variant, clustered lighting only shades the point lights assigned to each fragment's cluster
+        self.defines = ('CLUSTERED_LIGHTING',) if clustered_lighting else ()
+        # Shader file path -> (source, hash)
+        self.sources = {}
+        # Compiled programs by (vertex hash, fragment hash, defines), names expanding to the same sources share one program
+        self.cache = {}
+        # Variants are compiled the first time they are looked up, callbacks get every newly compiled program
+        self.programs = ProgramVariants(self)
+        self.on_compile = []
+
+        # Counters for benchmarking
+        self.compiles = 0
+        self.cache_hits = 0
+        self.compile_time = 0
+
+    def get_variant(self, name):
+        file_name, defines = VARIANTS[name]
+        return self.get_program(file_name, self.defines + defines)
+
+    def get_source(self, path):
+        if path not in self.sources:
+            with open(path) as file:
+                source = file.read()
+            self.sources[path] = source, hashlib.blake2b(source.encode(), digest_size=16).digest()
+        return self.sources[path]
 
-        self.programs['default'] = self.get_program('default')
+    # Defines go right after the #version line, which has to come first
+    @staticmethod
+    def add_defines(source, defines):
+        version, body = source.split('\n', 1)
+        return '\n'.join([version] + [f'#define {define}' for define in defines] + [body])
 
-    def get_program(self, name):
-        with open(f'shaders/{name}.vert') as file:
-            vertex_shader = file.read()
-        with open(f'shaders/{name}.frag') as file:
-            fragment_shader = file.read()
+    def get_program(self, name, defines=()):
+        vertex_shader, vertex_hash = self.get_source(f'shaders/{name}.vert')
+        fragment_shader, fragment_hash = self.get_source(f'shaders/{name}.frag')
+        # Defines neither stage tests would only split the cache
+        defines = tuple(sorted(define for define in set(defines) if define in vertex_shader or define in fragment_shader))
+        key = (vertex_hash, fragment_hash, defines)
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
 
-        program = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
+        # moderngl has no way to read or load program binaries, so programs are always compiled from source.
+        # Identical expanded sources still let the driver's own shader cache skip the backend compile
+        start = time.perf_counter()
+        program = self.ctx.program(vertex_shader=self.add_defines(vertex_shader, defines),
+                                   fragment_shader=self.add_defines(fragment_shader, defines))
+        self.compile_time += time.perf_counter() - start
+        self.compiles += 1
+        # Camera and light data come from the shared uniform buffers
+        UniformBufferHandler.bind_program(program)
+        self.cache[key] = program
+        for callback in self.on_compile:
+            callback(program)
         return program
 
+    def get_stats(self):
+        return {'programs': len(self.cache), 'compiles': self.compiles, 'cache_hits': self.cache_hits,
+                'compile_ms': self.compile_time * 1000}
+
     def destroy(self):
-        [program.release() for program in self.programs]
\ No newline at end of file
+        [program.release() for program in self.cache.values()]
+
+
+class ProgramVariants(dict):
+    def __init__(self, program_handler):
+        super().__init__()
+        self.program_handler = program_handler
+
+    def __missing__(self, name):
+        if name not in VARIANTS:
+            raise KeyError(name)
+        program = self[name] = self.program_handler.get_variant(name)
+        return program
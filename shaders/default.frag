@@ -7,7 +7,12 @@ in vec3 normal;
 in vec3 fragPos;
 
 
-uniform vec3 view_pos;
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_light;
+    vec4 view_pos;
+};
 
 
 struct Material {
@@ -40,11 +45,62 @@ struct PointLight {
     float s;
 };
 
-#define numPointLights 3
+#define MAX_POINT_LIGHTS 64
+
+// Packed into vec4s for std140, unpacked into the structs above
+struct PackedPointLight {
+    vec4 pos_constant;
+    vec4 color_linear;
+    vec4 quadratic_a_d_s;
+};
+
+layout (std140) uniform Lights {
+    vec4 dir_light_direction;
+    vec4 dir_light_color_a;
+    vec4 dir_light_d_s;
+    ivec4 num_point_lights;
+    PackedPointLight point_lights[MAX_POINT_LIGHTS];
+};
 
 uniform Material material;
-uniform DirectionalLight dir_light;
-uniform PointLight pointLights[numPointLights];
+
+DirectionalLight GetDirLight(){
+    return DirectionalLight(dir_light_direction.xyz, dir_light_color_a.rgb, dir_light_color_a.a, dir_light_d_s.x, dir_light_d_s.y);
+}
+
+#ifdef CLUSTERED_LIGHTING
+// Clustered lights, the uniform block point lights are unused
+#define INDEX_ROW 4096u
+
+uniform sampler2D u_light_data;
+uniform usampler2D u_cluster_grid;
+uniform usampler2D u_light_indices;
+uniform ivec3 u_cluster_dims;
+uniform vec2 u_tile_size;
+uniform vec2 u_depth_scale_bias;
+
+PointLight GetClusterLight(int i){
+    vec4 pos_constant = texelFetch(u_light_data, ivec2(0, i), 0);
+    vec4 color_linear = texelFetch(u_light_data, ivec2(1, i), 0);
+    vec4 quadratic_a_d_s = texelFetch(u_light_data, ivec2(2, i), 0);
+    return PointLight(pos_constant.xyz, pos_constant.w, color_linear.w, quadratic_a_d_s.x,
+                      color_linear.rgb, quadratic_a_d_s.y, quadratic_a_d_s.z, quadratic_a_d_s.w);
+}
+
+// (first index, count) of the lights touching this fragment's cluster
+uvec2 GetCluster(vec3 fragPos){
+    float depth = -(m_view * vec4(fragPos, 1.0)).z;
+    int slice = clamp(int(log(depth) * u_depth_scale_bias.x + u_depth_scale_bias.y), 0, u_cluster_dims.z - 1);
+    ivec2 tile = clamp(ivec2(gl_FragCoord.xy / u_tile_size), ivec2(0), u_cluster_dims.xy - 1);
+    return texelFetch(u_cluster_grid, ivec2(tile.x + tile.y * u_cluster_dims.x, slice), 0).xy;
+}
+#else
+PointLight GetPointLight(int i){
+    PackedPointLight light = point_lights[i];
+    return PointLight(light.pos_constant.xyz, light.pos_constant.w, light.color_linear.w, light.quadratic_a_d_s.x,
+                      light.color_linear.rgb, light.quadratic_a_d_s.y, light.quadratic_a_d_s.z, light.quadratic_a_d_s.w);
+}
+#endif
 
 vec3 CalcDirLight(DirectionalLight light, vec3 normal, vec3 viewDir){
     float gamma = 2.2;
@@ -95,11 +151,19 @@ vec3 CalcPointLight(PointLight light, vec3 normal, vec3 fragPos, vec3 viewDir){
 void main() {
     float gamma = 2.2;
 
-    vec3 viewDir = vec3(normalize(view_pos - fragPos));
-
-    vec3 result = CalcDirLight(dir_light, normal, viewDir);
-    for(int i = 0; i < numPointLights; i++)
-        result += CalcPointLight(pointLights[i], normal, fragPos, viewDir);  
+    vec3 viewDir = vec3(normalize(view_pos.xyz - fragPos));
+
+    vec3 result = CalcDirLight(GetDirLight(), normal, viewDir);
+#ifdef CLUSTERED_LIGHTING
+    uvec2 cluster = GetCluster(fragPos);
+    for(uint i = cluster.x; i < cluster.x + cluster.y; i++){
+        int light = int(texelFetch(u_light_indices, ivec2(i % INDEX_ROW, i / INDEX_ROW), 0).r);
+        result += CalcPointLight(GetClusterLight(light), normal, fragPos, viewDir);
+    }
+#else
+    for(int i = 0; i < num_point_lights.x; i++)
+        result += CalcPointLight(GetPointLight(i), normal, fragPos, viewDir);  
+#endif
 
     fragColor = vec4(result, 1.0);
     fragColor.rgb = pow(fragColor.rgb, vec3(1.0/gamma));
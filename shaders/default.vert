@@ -3,20 +3,36 @@
 layout (location = 0) in vec2 in_texcoord_0;
 layout (location = 1) in vec3 in_normal;
 layout (location = 2) in vec3 in_position;
+#ifdef INSTANCED
+// Per instance model matrix, takes locations 3 to 6
+layout (location = 3) in mat4 in_instance_model;
+#endif
 
 out vec2 uv_0;
 out vec3 normal;
 out vec3 fragPos;
 
-uniform mat4 m_proj;
-uniform mat4 m_view;
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_light;
+    vec4 view_pos;
+};
+
+#ifndef INSTANCED
 uniform mat4 m_model;
+#endif
 
 
 void main() {
+#ifdef INSTANCED
+    mat4 model = in_instance_model;
+#else
+    mat4 model = m_model;
+#endif
     uv_0 = in_texcoord_0;
-    fragPos = vec3(m_model * vec4(in_position, 1.0));
+    fragPos = vec3(model * vec4(in_position, 1.0));
     //normal = in_normal;
-    normal = normalize(mat3(transpose(inverse(m_model))) * in_normal);  
-    gl_Position = m_proj * m_view * m_model * vec4(in_position, 1.0);
+    normal = normalize(mat3(transpose(inverse(model))) * in_normal);  
+    gl_Position = m_proj * m_view * model * vec4(in_position, 1.0);
 }
\ No newline at end of file
@@ -0,0 +1,7 @@
+#version 330 core
+
+// Depth only pass
+
+
+void main() {
+}
\ No newline at end of file
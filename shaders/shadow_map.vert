@@ -0,0 +1,25 @@
+#version 330 core
+
+layout (location = 2) in vec3 in_position;
+#ifdef INSTANCED
+layout (location = 3) in mat4 in_instance_model;
+#else
+uniform mat4 m_model;
+#endif
+
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_light;
+    vec4 view_pos;
+};
+
+
+void main() {
+#ifdef INSTANCED
+    mat4 model = in_instance_model;
+#else
+    mat4 model = m_model;
+#endif
+    gl_Position = m_proj * m_view_light * model * vec4(in_position, 1.0);
+}
\ No newline at end of file
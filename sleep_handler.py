@@ -0,0 +1,85 @@
+import glm
+
+class SleepHandler():
+
+    # bodies slower than the thresholds for time_to_sleep seconds fall asleep together with their island
+    def __init__(self, linear_threshold = 0.1, angular_threshold = 0.1, time_to_sleep = 0.5):
+
+        self.linear_threshold = linear_threshold
+        self.angular_threshold = angular_threshold
+        self.time_to_sleep = time_to_sleep
+
+        # stats
+        self.awake = 0
+        self.sleeping = 0
+        self.islands = 0
+        self.wakes = 0
+
+    # groups bodies that touched this frame, immovable bodies do not join islands
+    def build_islands(self, objects, contacts):
+
+        parents = {id(obj) : id(obj) for obj in objects if not obj.immovable}
+
+        def find(key):
+            while parents[key] != key:
+                parents[key] = parents[parents[key]]
+                key = parents[key]
+            return key
+
+        for obj1, obj2, contact in contacts:
+            if obj1.immovable or obj2.immovable: continue
+            root1, root2 = find(id(obj1)), find(id(obj2))
+            if root1 != root2: parents[root2] = root1
+
+        islands = {}
+        for obj in objects:
+            if obj.immovable: continue
+            islands.setdefault(find(id(obj)), []).append(obj)
+        return list(islands.values())
+
+    def update(self, objects, contacts, delta_time):
+
+        self.awake, self.sleeping, self.islands = 0, 0, 0
+        for island in self.build_islands(objects, contacts):
+            self.islands += 1
+
+            # sleeping islands keep the membership they fell asleep with
+            if all(obj.sleeping for obj in island):
+                self.sleeping += len(island)
+                continue
+
+            for obj in island:
+                obj.island = island
+                if glm.length(obj.hitbox.vel) < self.linear_threshold and glm.length(obj.hitbox.rot_vel) < self.angular_threshold:
+                    obj.sleep_timer += delta_time
+                else: obj.sleep_timer = 0
+
+            if all(obj.sleep_timer >= self.time_to_sleep for obj in island):
+                for obj in island: self.put_to_sleep(obj)
+                self.sleeping += len(island)
+            else: self.awake += len(island)
+
+    def put_to_sleep(self, obj):
+
+        obj.sleeping = True
+        obj.hitbox.set_vel(glm.vec3(0, 0, 0))
+        obj.hitbox.set_rot_vel(glm.vec3(0, 0, 0))
+
+    # wakes every body in the island of obj
+    def wake(self, obj):
+
+        if not obj.sleeping: return
+        self.wakes += 1
+        for member in obj.island if obj.island else [obj]:
+            member.sleeping = False
+            member.sleep_timer = 0
+
+    # an awake body touching a sleeping one wakes the sleeping island
+    def on_contact(self, obj1, obj2):
+
+        if obj1.sleeping and not obj2.sleeping and not obj2.immovable: self.wake(obj1)
+        if obj2.sleeping and not obj1.sleeping and not obj1.immovable: self.wake(obj2)
+
+    def get_stats(self):
+
+        return {'awake' : self.awake, 'sleeping' : self.sleeping, 'islands' : self.islands, 'wakes' : self.wakes}
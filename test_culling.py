@@ -0,0 +1,33 @@
+import glm
+import numpy as np
+from culling import BVH, Frustum, OUTSIDE
+
+# bvh culling against testing every box, run with python -m pytest
+
+def get_matrices(positions):
+
+    matrices = np.tile(np.eye(4, dtype='f4'), (len(positions), 1, 1))
+    matrices[:, 3, :3] = positions
+    return matrices
+
+def test_bvh_matches_brute_force():
+
+    # 1003 bodies leave the last leaf short and pad the tree with empty leaves
+    rng = np.random.default_rng(0)
+    count = 1003
+    positions = rng.uniform(-100, 100, (count, 3)).astype('f4')
+    local_min, local_max = -rng.uniform(0.5, 2, (count, 3)), rng.uniform(0.5, 2, (count, 3))
+    m_proj = glm.perspective(glm.radians(50), 16 / 9, 0.1, 250)
+    bvh = BVH(brute_force_count=0)
+
+    # a few bodies moving refit only their leaves, most of them the whole tree, a large spread rebuilds it
+    for frame, (moving, step) in enumerate([(0, 0), (20, 1), (20, 1), (800, 2), (count, 0), (300, 150)]):
+        positions[:moving] += rng.uniform(-step, step, (moving, 3)).astype('f4')
+        matrices = get_matrices(positions)
+        bvh.update(matrices, local_min, local_max)
+
+        frustum = Frustum(m_proj * glm.lookAt(glm.vec3(0), glm.vec3(np.cos(frame), 0.2, np.sin(frame)), glm.vec3(0, 1, 0)))
+        expected = frustum.classify(*bvh.get_world_bounds(matrices, local_min, local_max)) != OUTSIDE
+        assert expected.any()
+        assert (bvh.cull(frustum) == expected).all()
+    assert bvh.builds == 2
@@ -0,0 +1,59 @@
+from physics_world import PhysicsWorld, build_box_rain
+from physics_engine import PhysicsEngine
+from broad_phase import BruteForce, SweepAndPrune, SpatialHash
+from recorder import Recorder, read_recording, replay
+from benchmark import benchmark_continuous_collision, benchmark_parallel_narrow_phase
+
+# correctness checks the benchmarks report, run with python -m pytest
+
+def test_broad_phases_find_the_same_pairs():
+
+    # a crowded seeded scene of mixed sizes and rotations, with immovable and sleeping bodies among them
+    physics = PhysicsWorld(seed=7)
+    rng = physics.rng
+    for i in range(150):
+        physics.add_body(pos=(rng.uniform(-8, 8), rng.uniform(-8, 8), rng.uniform(-8, 8)), rot=(rng.uniform(-180, 180), 0, rng.uniform(-180, 180)),
+                         scale=(rng.uniform(0.2, 2), rng.uniform(0.2, 2), rng.uniform(0.2, 2)), immovable=i % 5 == 0)
+    for body in physics.bodies[1::7]: body.sleeping = True
+    physics.world.update_model_matrices()
+
+    def get_pairs(broad_phase):
+        return {frozenset((obj1.index, obj2.index)) for obj1, obj2 in broad_phase.get_pairs(physics.bodies)}
+
+    expected = get_pairs(BruteForce())
+    resting = {body.index for body in physics.bodies if body.immovable or body.sleeping}
+    assert any(pair & resting for pair in expected)
+    assert not any(pair <= resting for pair in expected)
+    assert get_pairs(SweepAndPrune()) == expected
+    assert get_pairs(SpatialHash()) == expected
+
+def test_replay_matches_recording(tmp_path):
+
+    physics = PhysicsWorld(seed=1234)
+    build_box_rain(physics)
+    recorder = Recorder(physics, 'box_rain', snapshot_interval=20)
+    for i in range(120): physics.step(1 / 60)
+    recorder.save(tmp_path / 'run.rrec')
+
+    result = replay(read_recording(tmp_path / 'run.rrec'))
+    assert result['snapshots_checked'] == 7
+    assert result['max_error'] == 0
+    assert result['first_divergence'] is None
+
+def test_continuous_collision_stops_tunneling():
+
+    # the discrete runs losing boxes shows the scenario is fast enough to need the sweep
+    for run in benchmark_continuous_collision(count=20, seconds=2, delta_times=(1 / 15, 1 / 8)):
+        assert run['discrete']['tunneled'] > 0
+        assert run['continuous']['tunneled'] == 0
+
+def test_continuous_collision_can_be_turned_off():
+
+    assert PhysicsEngine(-9.8, continuous_collision=None).continuous_collision is None
+    assert PhysicsEngine(-9.8, continuous_collision=False).continuous_collision is None
+    assert PhysicsEngine(-9.8).continuous_collision is not None
+
+def test_parallel_narrow_phase_is_deterministic():
+
+    result = benchmark_parallel_narrow_phase('pile', steps=5, max_workers=2)
+    assert result['deterministic']
@@ -0,0 +1,68 @@
+import time
+import pytest
+
+pytest.importorskip('pygame')
+import moderngl as mgl
+from camera import Camera
+from scene import Scene
+
+# builds the game's scene and renders a frame on a standalone context, run with python -m pytest
+
+class App():
+
+    def __init__(self):
+
+        self.win_size = (320, 180)
+        self.seed = 0
+        self.record_path = None
+        self.physics_hz = 60
+        self.max_substeps = 5
+        self.delta_time = 16
+
+class GraphicsEngine():
+
+    def __init__(self, app, ctx):
+
+        self.app = app
+        self.ctx = ctx
+        self.camera = Camera(app)
+
+def get_context():
+
+    for backend in (None, 'egl'):
+        try: return mgl.create_standalone_context(**({'backend' : backend} if backend else {}))
+        except Exception: continue
+    pytest.skip('no standalone gl context')
+
+def test_scene_renders_a_frame():
+
+    ctx = get_context()
+    ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
+    app = App()
+
+    scene = Scene(GraphicsEngine(app, ctx))
+
+    # standalone contexts have no window, the main pass draws into an offscreen framebuffer instead
+    screen = ctx.simple_framebuffer(app.win_size)
+    def render_main():
+        screen.use()
+        scene.objects.render()
+    scene.render_main = render_main
+
+    # placeholders first, then the loaded meshes and textures
+    scene.update(app.delta_time)
+    scene.render()
+    start = time.perf_counter()
+    while not scene.asset_loader.is_done() and time.perf_counter() - start < 60:
+        scene.asset_loader.update()
+        time.sleep(0.01)
+    assert scene.asset_loader.is_done()
+    scene.update(app.delta_time)
+    scene.render()
+
+    objects = scene.objects
+    assert objects.get_culling_stats()['total'] == 40
+    assert objects.get_draw_calls() > 0
+    scene.destroy()
+    screen.release()
+    ctx.release()
@@ -1,22 +1,60 @@
 import pygame as pg
 import moderngl as mgl
+from asset_registry import registry
 
 class TextureHandler:
-    def __init__(self, ctx):
+    def __init__(self, ctx, win_size, asset_loader=None):
         self.ctx = ctx
+        self.asset_loader = asset_loader
 
+        # Textures are shared through the registry, keyed on the image path
+        registry.register_loader('texture', self.decode_texture, self.release_texture, self.upload_texture)
+        self.paths = {}
+        self.paths[0] = 'textures/img.png'
+        self.paths['container'] = 'textures/container.png'
+        self.paths['container_specular'] = 'textures/container_specular.png'
+        self.paths['metal_box'] = 'textures/img_1.png'
+        self.paths['cat'] = 'objects/cat/20430_cat_diff_v1.jpg'
         self.textures = {}
-        self.textures[0] = self.get_texture('textures/img.png')
-        self.textures['container'] = self.get_texture('textures/container.png')
-        self.textures['container_specular'] = self.get_texture('textures/container_specular.png')
-        self.textures['metal_box'] = self.get_texture('textures/img_1.png')
-        self.textures['cat'] = self.get_texture('objects/cat/20430_cat_diff_v1.jpg')
+        self.ready = set()
+        # Flat grey until the loader has uploaded each image
+        self.placeholder = self.upload_texture(((1, 1), bytes((128, 128, 128))))
+        for name, path in self.paths.items():
+            self.load(name, path)
+        # Shadow map, drawn into by the shadow pass
+        self.textures['depth_texture'] = self.get_depth_texture(win_size)
+
+    def load(self, name, path):
+        if self.asset_loader:
+            self.textures[name] = self.placeholder
+            self.asset_loader.request('texture', path, lambda texture: self.set_texture(name, texture))
+        else:
+            self.set_texture(name, registry.acquire('texture', path))
+
+    def set_texture(self, name, texture):
+        self.textures[name] = texture
+        self.ready.add(name)
+
+    def get_depth_texture(self, win_size):
+        depth_texture = self.ctx.depth_texture(win_size)
+        depth_texture.repeat_x = False
+        depth_texture.repeat_y = False
+        return depth_texture
 
     def get_texture(self, path):
-        texture = pg.image.load(path).convert()
+        return self.upload_texture(self.decode_texture(path))
+
+    # Worker thread, image decode and flip
+    @staticmethod
+    def decode_texture(path):
+        texture = pg.image.load(path)
         texture = pg.transform.flip(texture, False, True)
-        texture = self.ctx.texture(size=texture.get_size(), components=3,
-                                   data = pg.image.tostring(texture, 'RGB'))
+        return texture.get_size(), pg.image.tostring(texture, 'RGB')
+
+    # Main thread, only the gl calls
+    def upload_texture(self, data):
+        size, pixels = data
+        texture = self.ctx.texture(size=size, components=3, data=pixels)
         # Mipmaps
         texture.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
         texture.build_mipmaps()
@@ -25,5 +63,11 @@ class TextureHandler:
 
         return texture
 
+    @staticmethod
+    def release_texture(texture):
+        texture.release()
+
     def destroy(self):
-        [tex.release() for tex in self.textures.values()]
\ No newline at end of file
+        [registry.release('texture', self.paths[name]) for name in self.ready]
+        self.placeholder.release()
+        self.textures['depth_texture'].release()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import numpy as np
+from profiler import profiler
+
+# Binding points shared by every program
+CAMERA_BINDING = 0
+LIGHTS_BINDING = 1
+# Must match MAX_POINT_LIGHTS in the shaders
+MAX_POINT_LIGHTS = 64
+
+
+class UniformBufferHandler:
+    def __init__(self, ctx):
+        self.ctx = ctx
+        # std140 layout, every member is a vec4 or mat4 so no padding rules apply
+        # Camera: mat4 m_proj, mat4 m_view, mat4 m_view_light, vec4 view_pos
+        self.camera_data = np.zeros(16 * 3 + 4, dtype='f4')
+        # Lights: DirLight (3 vec4), ivec4 count, PointLight[MAX_POINT_LIGHTS] (3 vec4 each)
+        self.lights_data = np.zeros(4 * 3 + 4 + MAX_POINT_LIGHTS * 4 * 3, dtype='f4')
+        self.camera_ubo = self.ctx.buffer(reserve=self.camera_data.nbytes, dynamic=True)
+        self.lights_ubo = self.ctx.buffer(reserve=self.lights_data.nbytes, dynamic=True)
+        self.camera_ubo.bind_to_uniform_block(CAMERA_BINDING)
+        self.lights_ubo.bind_to_uniform_block(LIGHTS_BINDING)
+        # Last uploaded contents, buffers are only written when these change
+        self.camera_written = None
+        self.lights_written = None
+        self.writes = 0
+
+    # Points the blocks of a program at the shared binding points
+    @staticmethod
+    def bind_program(program):
+        for name, binding in (('Camera', CAMERA_BINDING), ('Lights', LIGHTS_BINDING)):
+            if name in program:
+                program[name].binding = binding
+
+    def update(self, camera, light_handler):
+        self.pack_camera(camera, light_handler.dir_light)
+        self.pack_lights(light_handler)
+        self.camera_written = self.write(self.camera_ubo, self.camera_data, self.camera_written)
+        self.lights_written = self.write(self.lights_ubo, self.lights_data, self.lights_written)
+
+    def write(self, ubo, data, written):
+        if written is not None and np.array_equal(data, written):
+            return written
+        ubo.write(data)
+        self.writes += 1
+        profiler.count('uniform_writes')
+        return data.copy()
+
+    def pack_camera(self, camera, dir_light):
+        data = self.camera_data
+        # glm matrices are column major in memory, as std140 expects
+        data[0:16] = np.frombuffer(camera.m_proj.to_bytes(), dtype='f4')
+        data[16:32] = np.frombuffer(camera.m_view.to_bytes(), dtype='f4')
+        data[32:48] = np.frombuffer(dir_light.m_view_light.to_bytes(), dtype='f4')
+        data[48:51] = camera.position
+
+    def pack_lights(self, light_handler):
+        data = self.lights_data
+        light = light_handler.dir_light
+        # Scalars are glm.float32, a ctypes float
+        # direction, (color, ambient), (diffuse, specular)
+        data[0:3] = light.dir
+        data[4:7], data[7] = light.color, light.a.value
+        data[8], data[9] = light.d.value, light.s.value
+        point_lights = light_handler.get_point_light_data()[:MAX_POINT_LIGHTS]
+        data[12:16].view('i4')[0] = len(point_lights)
+        # (pos, constant), (color, linear), (quadratic, ambient, diffuse, specular)
+        data[16:16 + point_lights.size] = point_lights.ravel()
+
+    def destroy(self):
+        self.camera_ubo.release()
+        self.lights_ubo.release()
@@ -3,10 +3,11 @@ from shader_program_handler import ProgramHandler
 
 
 class VAOHandler:
-    def __init__(self, ctx):
+    def __init__(self, ctx, asset_loader=None):
         self.ctx = ctx
 
-        self.vbo_handler = VBOHandler(self.ctx)
+        self.vbo_handler = VBOHandler(self.ctx, asset_loader)
+        self.vbo_handler.on_ready.append(self.on_vbo_ready)
         self.program_handler = ProgramHandler( self.ctx)
 
         self.vaos = {}
@@ -14,12 +15,40 @@ class VAOHandler:
                                          vbo=self.vbo_handler.vbos['cube'])
         self.vaos['cat'] = self.get_vao(program=self.program_handler.programs['default'], 
                                          vbo=self.vbo_handler.vbos['cat'])
+        # Shadow pass, depth only
+        self.vaos['shadow_cube'] = self.get_vao(program=self.program_handler.programs['shadow_map'],
+                                                vbo=self.vbo_handler.vbos['cube'])
+        self.vaos['shadow_cat'] = self.get_vao(program=self.program_handler.programs['shadow_map'],
+                                               vbo=self.vbo_handler.vbos['cat'])
 
+    # Rebuilds the vaos of a mesh that finished loading in the background
+    def on_vbo_ready(self, name):
+        for vao_name in (name, f'shadow_{name}'):
+            if vao_name not in self.vaos:
+                continue
+            program = self.vaos[vao_name].program
+            self.vaos[vao_name].release()
+            self.vaos[vao_name] = self.get_vao(program=program, vbo=self.vbo_handler.vbos[name])
+
+    # Attributes the program does not read (texture coordinates and normals in the shadow pass) are skipped
     def get_vao(self, program, vbo):
         print(vbo.format, *vbo.attribs)
-        vao =  self.ctx.vertex_array(program, [(vbo.vbo, vbo.format, *vbo.attribs)])
+        vao =  self.ctx.vertex_array(program, [(vbo.vbo, vbo.format, *vbo.attribs)],
+                                     index_buffer=vbo.ibo, index_element_size=vbo.index_element_size, skip_errors=True)
+        # The index buffer also holds the simplified levels, plain renders draw the full mesh
+        vao.vertices = vbo.lods[0][1]
+        return vao
+
+    # Adds a per instance model matrix stream on top of the mesh vbo, attributes the program does not read
+    # (texture coordinates and normals in the shadow pass) are skipped
+    def get_instanced_vao(self, program, vbo, instance_buffer):
+        vao = self.ctx.vertex_array(program, [(vbo.vbo, vbo.format, *vbo.attribs),
+                                              (instance_buffer, '16f/i', 'in_instance_model')],
+                                    index_buffer=vbo.ibo, index_element_size=vbo.index_element_size, skip_errors=True)
+        vao.vertices = vbo.lods[0][1]
         return vao
     
-    def desstroy(self):
+    def destroy(self):
+        [vao.release() for vao in self.vaos.values()]
         self.vbo_handler.destroy()
         self.program_handler.destroy()
\ No newline at end of file
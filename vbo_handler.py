@@ -1,22 +1,72 @@
 import numpy as np
-import pywavefront
+from mesh_cache import weld
+from asset_registry import registry
+
+# Largest error in pixels a simplified level may show on screen
+LOD_PIXEL_ERROR = 1.5
 
 
 class VBOHandler:
-    def __init__(self, ctx):
+    def __init__(self, ctx, asset_loader=None):
         self.ctx = ctx
+        self.asset_loader = asset_loader
+        # Called with the vbo name whenever a mesh replaces its placeholder
+        self.on_ready = []
+        # Buffers are shared through the registry, keyed on the mesh path
+        registry.register_loader('vbo', self.decode_vbo, self.release_vbo, self.upload_vbo)
+        self.paths = {}
+        self.paths['cube'] = 'cube'
+        self.paths['cat'] = 'objects/cat/20430_Cat_v1_NEW.obj'
         self.vbos = {}
-        self.vbos['cube'] = CubeVBO(self.ctx)
-        self.vbos['cat'] = ModelVBO(self.ctx, 'objects/cat/20430_Cat_v1_NEW.obj')
+        self.ready = set()
+        for name, path in self.paths.items():
+            self.load(name, path)
+
+    def load(self, name, path):
+        # The cube stands in for models until the loader has uploaded them
+        if self.asset_loader and path != 'cube':
+            self.vbos[name] = self.vbos['cube']
+            self.asset_loader.request('vbo', path, lambda vbo: self.set_vbo(name, vbo))
+        else:
+            self.set_vbo(name, registry.acquire('vbo', path))
+
+    def set_vbo(self, name, vbo):
+        self.vbos[name] = vbo
+        self.ready.add(name)
+        for callback in self.on_ready:
+            callback(name)
+
+    # Worker thread, reads or compiles the mesh cache
+    @staticmethod
+    def decode_vbo(path):
+        if path == 'cube':
+            return path, None, None
+        mesh = registry.acquire('mesh', path)
+        registry.release('mesh', path)
+        return path, mesh.get_render_data(), mesh.get_lods()
+
+    # Main thread, only the buffer uploads
+    def upload_vbo(self, data):
+        path, welded_data, lods = data
+        if path == 'cube':
+            return CubeVBO(self.ctx)
+        return ModelVBO(self.ctx, path, welded_data, lods)
+
+    @staticmethod
+    def release_vbo(vbo):
+        vbo.vbo.release()
+        vbo.ibo.release()
 
-    def desstroy(self):
-        [vbo.vbo.release() for vbo in self.vbos.values()]
+    def destroy(self):
+        [registry.release('vbo', self.paths[name]) for name in self.ready]
 
 
 class BaseVBO:
-    def __init__(self, ctx):
+    def __init__(self, ctx, welded_data=None, lods=None):
         self.ctx = ctx
-        self.vbo = self.get_vbo()
+        self.vbo = self.get_vbo(welded_data)
+        self.ibo = self.get_ibo(lods or [])
+        self.index_element_size = self.indices.itemsize
         self.format: str = None
         self.attrib: list = None
 
@@ -27,10 +77,35 @@ class BaseVBO:
         data = [verticies[ind] for triangle in indicies for ind in triangle]
         return np.array(data, dtype='f4')
 
-    def get_vbo(self):
-        vertex_data = self.get_vertex_data()
+    # Merges identical vertices, returns the unique vertices and 16 or 32 bit indices into them
+    def get_welded_data(self):
+        return weld(self.get_vertex_data())
+
+    def get_vbo(self, welded_data=None):
+        vertex_data, self.indices = welded_data if welded_data is not None else self.get_welded_data()
+        # Sizes in bytes, before and after welding
+        self.unrolled_size = len(self.indices) * vertex_data.shape[1] * 4
+        self.indexed_size = vertex_data.nbytes + self.indices.nbytes
         vbo = self.ctx.buffer(vertex_data)
         return vbo
+
+    # Simplified levels index the same vertices, their indices follow the full mesh in one buffer
+    def get_ibo(self, lods):
+        levels = [(self.indices, 0.0)] + lods
+        # (first index, index count) and error in mesh units per level
+        self.lods = []
+        self.lod_errors = np.array([error for indices, error in levels], dtype='f4')
+        ibo = self.ctx.buffer(reserve=sum(len(indices) for indices, error in levels) * self.indices.itemsize)
+        first = 0
+        for indices, error in levels:
+            ibo.write(np.ascontiguousarray(indices, dtype=self.indices.dtype), offset=first * self.indices.itemsize)
+            self.lods.append((first, len(indices)))
+            first += len(indices)
+        return ibo
+
+    # Coarsest level whose error stays under LOD_PIXEL_ERROR, given the pixels one mesh unit covers on screen
+    def get_lod(self, pixels_per_unit):
+        return np.searchsorted(self.lod_errors, LOD_PIXEL_ERROR / np.maximum(pixels_per_unit, 1e-9), side='right') - 1
     
 
 class CubeVBO(BaseVBO):
@@ -75,15 +150,17 @@ class CubeVBO(BaseVBO):
     
 
 class ModelVBO(BaseVBO):
-    def __init__(self, ctx, path):
+    def __init__(self, ctx, path, welded_data=None, lods=None):
         self.path = path
-        super().__init__(ctx)
+        if welded_data is None:
+            mesh = self.get_mesh()
+            welded_data, lods = mesh.get_render_data(), mesh.get_lods()
+        super().__init__(ctx, welded_data, lods)
         self.format = '2f 3f 3f'
         self.attribs = ['in_texcoord_0', 'in_normal', 'in_position']
 
-    def get_vertex_data(self):
-        objs = pywavefront.Wavefront(self.path, cache=True, parse=True)
-        obj = objs.materials.popitem()[1]
-        vertex_data = obj.vertices
-        vertex_data = np.array(vertex_data, dtype='f4')
-        return vertex_data
\ No newline at end of file
+    # Memory mapped arrays from the compiled mesh cache, uploaded without intermediate copies
+    def get_mesh(self):
+        mesh = registry.acquire('mesh', self.path)
+        registry.release('mesh', self.path)
+        return mesh
\ No newline at end of file